@@ -1,13 +1,22 @@
 import os
-from fastapi import FastAPI, Query
+import time
+import asyncio
+from fastapi import FastAPI, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from starlette.middleware.cors import CORSMiddleware
 import cv2
-from ..db.database_manager import DatabaseManager
-from pathlib import Path
+from ..db.database_manager import DatabaseManager, epoch_ms, local_time
+from ..db.archive import ARCHIVE_DIR
 from device.utils.logger import get_logger
+from device.utils.preview import mjpeg_stream
+from .heatmap import HeatmapBuilder, render_png
+from .trajectories import trajectory_stream
+from .export import events_ndjson, events_csv
+from .response_cache import ResponseCacheMiddleware
+from .log_tail import LogTailer
 
 # Initialize logger for API
 logger = get_logger("API")
@@ -25,8 +34,19 @@ app = FastAPI()
 snapshot_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),"device", "snapshot")
 db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "db","events.db")
 
-db_manager = DatabaseManager(db_path)
+# Reads include rows the device's retention job moved to the archive.
+# Pooled: endpoints run on a thread pool, each thread reads through its own connection
+db_manager = DatabaseManager(db_path, archive_dir=ARCHIVE_DIR, pooled=True)
+heatmap_builder = HeatmapBuilder(db_manager)
+log_tailer = LogTailer()
 
+# Configuration only changes through the write endpoints below, so dashboard polls are
+# answered from memory (or with 304) until one of them is called.
+app.add_middleware(
+    ResponseCacheMiddleware,
+    cached_paths=("/config/current", "/config/locations", "/config/location/", "/zones/fetch_all"),
+    invalidating_paths=("/setup_config", "/zones", "/config/"),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,14 +59,37 @@ app.add_middleware(
 
 
 @app.get("/events")
-def fetch_events():
+def fetch_events(limit: int = Query(500, ge=1, le=5000), after: int = Query(None, ge=0), location_id: int = None):
+    """
+    One page of events in event_id order. Pass the returned next_cursor as after to get
+    the next page; it is null on the last page.
+    """
     try:
-        rows = db_manager.get_all_events()
-        return rows
+        rows, next_cursor = db_manager.get_events_page(limit, after, location_id)
+        return {"events": rows, "next_cursor": next_cursor}
     except Exception as e:
         logger.error(f"Failed to fetch events: {e}")
         raise
 
+@app.get("/events/export")
+def export_events(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), location_id: int = None,
+                  start: str = None, end: str = None):
+    """
+    Streams all events (optionally of one location and within [start, end)) as NDJSON or CSV.
+    Rows are read in chunks, so memory use does not depend on the size of the table.
+    """
+    try:
+        for value in (start, end):
+            if value is not None:
+                local_time(value)
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid time range: {str(e)}"}
+    chunks = db_manager.iter_events(location_id, start, end)
+    if format == "csv":
+        return StreamingResponse(events_csv(chunks), media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=events.csv"})
+    return StreamingResponse(events_ndjson(chunks), media_type="application/x-ndjson")
+
 @app.get("/snapshot")
 def take_snapshot():
     try:
@@ -70,6 +113,14 @@ def take_snapshot():
         logger.error(f"Error taking snapshot: {e}")
         return {"error": f"Failed to take snapshot: {str(e)}"}
 
+@app.get("/preview")
+def preview_stream(fps: float = Query(5, gt=0, le=15)):
+    """
+    Live MJPEG preview of the annotated camera feed.
+    The device only renders preview frames while a client is connected to this stream.
+    """
+    return StreamingResponse(mjpeg_stream(max_fps=fps), media_type="multipart/x-mixed-replace; boundary=frame")
+
 @app.post("/zones")
 def receive_zones(zone_data: dict):
     try:
@@ -141,27 +192,55 @@ def setup_config(config_data: ConfigData):
 
 
 @app.get("/logs")
-def get_logs():
+def get_logs(cursor: str = None, max_bytes: int = Query(256 * 1024, ge=1024, le=4 * 1024 * 1024)):
+    """
+    Log lines after cursor (the cursor returned by the previous call), following rotations.
+    Without a cursor the last max_bytes of the log are returned. more is set if there
+    are further lines to fetch right away.
+    """
     try:
-        log_path = Path(__file__).resolve().parent.parent.parent / "device" / "logs" / "device.log"
-        if log_path.exists():
-            with open(log_path, "r") as f:
-                lines = f.read().splitlines()
-                return {"logs": lines}
-        else:
-            logger.warning(f"Log file not found at: {log_path}")
-            return {"logs": []}
+        lines, next_cursor, more = log_tailer.read(cursor, max_bytes)
+        return {"logs": lines, "cursor": next_cursor, "more": more}
+    except ValueError:
+        return {"logs": [], "error": f"Invalid cursor: {cursor}"}
     except Exception as e:
         logger.error(f"Failed to retrieve logs: {e}")
         return {"logs": [], "error": str(e)}
 
+@app.get("/logs/stream")
+async def stream_logs(request: Request, cursor: str = None, interval: float = Query(0.5, ge=0.1, le=10)):
+    """
+    Server-sent events with new log lines. Every event holds a batch of lines (one per data
+    field) and carries the cursor as its id, so a reconnecting EventSource resumes where it
+    stopped through Last-Event-ID. Without a cursor the stream starts at the end of the log.
+    """
+    cursor = request.headers.get("last-event-id") or cursor
+    try:
+        if cursor is None:
+            cursor = log_tailer.end_cursor()
+    except Exception as e:
+        logger.error(f"Failed to start log stream: {e}")
+        return {"status": "error", "message": str(e)}
 
-
+    async def events():
+        nonlocal cursor
+        while not await request.is_disconnected():
+            try:
+                lines, cursor, more = await run_in_threadpool(log_tailer.read, cursor)
+            except ValueError:
+                yield "event: error\ndata: invalid cursor\n\n"
+                return
+            if lines:
+                yield f"id: {cursor}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+            # Catching up: only yield to the event loop, otherwise wait for new lines
+            await asyncio.sleep(0 if more else interval)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/zones/fetch_all")
-def get_zones():
+def get_zones(location_id: int = None):
     try:
-        zones = db_manager.fetch_all_zones()
+        zones = db_manager.fetch_all_zones(location_id)
         return zones
     except Exception as e:
         logger.error(f"Failed to fetch zones: {e}")
@@ -392,3 +471,62 @@ def get_snapshot_by_location(location_id: int):
 @app.get("/events_time")
 def get_events_time(location_id: int, start_date: str, end_date: str):
     return db_manager.get_events_by_date(location_id, start_date, end_date)
+
+@app.get("/stats")
+def get_stats(location_id: int, start: str, end: str):
+    """ Dashboard statistics for [start, end) from the event rollups, see DatabaseManager.get_stats. """
+    try:
+        return db_manager.get_stats(location_id, start, end)
+    except Exception as e:
+        logger.error(f"Failed to get stats: {e}")
+        return {"status": "error", "message": f"Failed to get stats: {str(e)}"}
+
+@app.get("/heatmap")
+def get_heatmap(location_id: int, start: str, end: str, bins: int = Query(64, ge=4, le=512),
+                format: str = Query("json", pattern="^(json|png)$"), width: int = None, height: int = None):
+    """
+    Occupancy heatmap of foot positions in [start, end).
+    The grid covers the camera frame, whose size is taken from the location snapshot unless
+    width and height are given; bins is the number of columns. format=png returns an
+    overlay with the snapshot's size, json the raw counts per cell.
+    """
+    try:
+        if width is None or height is None:
+            snapshot = cv2.imread(os.path.join(snapshot_path, f"snapshot_location_{location_id}.png"))
+            if snapshot is None:
+                return {"status": "error", "message": "Snapshot not found, pass width and height"}
+            height, width = snapshot.shape[:2]
+        bins_y = max(1, round(bins * height / width))
+
+        hist = heatmap_builder.histogram(location_id, epoch_ms(start), epoch_ms(end), width, height,
+                                         bins, bins_y, int(time.time() * 1000))
+        if format == "png":
+            return Response(content=render_png(hist, width, height), media_type="image/png")
+        return {
+            "location_id": location_id,
+            "width": width,
+            "height": height,
+            "bins": [bins, bins_y],
+            "max": int(hist.max()),
+            "counts": hist.astype(int).tolist(),
+        }
+    except Exception as e:
+        logger.error(f"Failed to compute heatmap: {e}")
+        return {"status": "error", "message": f"Failed to compute heatmap: {str(e)}"}
+
+@app.get("/trajectories")
+def get_trajectories(location_id: int, start: str, end: str, object_id: int = None,
+                     tolerance: float = Query(0.0, ge=0), resample_ms: int = Query(None, gt=0),
+                     max_gap_ms: int = Query(2000, gt=0)):
+    """
+    Streams per-object trajectories in [start, end) as NDJSON, one object per line.
+    tolerance simplifies each polyline (Ramer-Douglas-Peucker, in pixels), resample_ms
+    resamples it at a fixed rate without bridging gaps longer than max_gap_ms.
+    """
+    try:
+        start_ms, end_ms = epoch_ms(start), epoch_ms(end)
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid time range: {str(e)}"}
+    lines = trajectory_stream(db_manager, location_id, start_ms, end_ms, object_id,
+                              tolerance=tolerance, resample_ms=resample_ms, max_gap_ms=max_gap_ms)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
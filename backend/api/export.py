@@ -0,0 +1,24 @@
+import csv
+import io
+import json
+from backend.db.archive import EVENT_COLUMNS
+
+
+def events_ndjson(chunks):
+    """ One JSON object per event and line, chunk by chunk. """
+    for rows in chunks:
+        yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+
+
+def events_csv(chunks):
+    """ CSV with a header line, written chunk by chunk so only one chunk is buffered. """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EVENT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+import cv2
+from backend.db.database_manager import MS_PER_DAY
+from backend.db.archive import utc_day
+
+HEATMAP_CACHE_DIR = Path(__file__).resolve().parent.parent / "db" / "heatmap_cache"
+
+
+class HeatmapBuilder:
+    """
+    Occupancy heatmaps from stored foot positions.
+
+    A heatmap is a (bins_y, bins_x) histogram of position samples over the camera
+    frame, so each cell is proportional to the time people spent there. Positions
+    are binned chunk by chunk while streaming them from the database. Histograms of
+    finished UTC days are cached on disk per location, so a long range only has to
+    read the positions of the days that are not cached yet.
+
+    Positions of a day can still arrive after midnight (buffered by the EventManager,
+    replayed from the DB journal, or delayed by a backlogged DB worker), so a day is
+    only cached once it ended more than grace_ms ago.
+    """
+    def __init__(self, db_manager, cache_dir=HEATMAP_CACHE_DIR, chunk_size=50000, grace_ms=MS_PER_DAY):
+        self.db_manager = db_manager
+        self.cache_dir = Path(cache_dir)
+        self.chunk_size = chunk_size
+        self.grace_ms = grace_ms
+
+    def histogram(self, location_id, start_ms, end_ms, width, height, bins_x, bins_y, now_ms):
+        grid = (width, height, bins_x, bins_y)
+        hist = np.zeros((bins_y, bins_x), dtype=np.float64)
+        day = start_ms // MS_PER_DAY
+        while day * MS_PER_DAY < end_ms:
+            day_start, day_end = day * MS_PER_DAY, (day + 1) * MS_PER_DAY
+            if start_ms <= day_start and day_end <= end_ms and day_end + self.grace_ms <= now_ms:
+                hist += self._day_tile(location_id, day, grid)
+            else:
+                hist += self._compute(location_id, max(start_ms, day_start), min(end_ms, day_end), grid)
+            day += 1
+        return hist
+
+    def _day_tile(self, location_id, day, grid):
+        width, height, bins_x, bins_y = grid
+        path = (self.cache_dir / f"location_{location_id}" /
+                f"{utc_day(day * MS_PER_DAY)}_{width}x{height}_{bins_x}x{bins_y}.npy")
+        if path.exists():
+            return np.load(path)
+
+        hist = self._compute(location_id, day * MS_PER_DAY, (day + 1) * MS_PER_DAY, grid)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A temp file per write, so concurrent requests for the same tile cannot interleave
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, suffix=".tmp", delete=False) as f:
+            np.save(f, hist)
+        os.replace(f.name, path)
+        return hist
+
+    def _compute(self, location_id, start_ms, end_ms, grid):
+        width, height, bins_x, bins_y = grid
+        counts = np.zeros(bins_y * bins_x, dtype=np.int64)
+        for rows in self.db_manager.iter_positions(location_id, start_ms, end_ms, self.chunk_size):
+            points = np.array(rows, dtype=np.float64)[:, 2:4]
+            ix = np.floor(points[:, 0] * (bins_x / width)).astype(np.int64)
+            iy = np.floor(points[:, 1] * (bins_y / height)).astype(np.int64)
+            inside = (ix >= 0) & (ix < bins_x) & (iy >= 0) & (iy < bins_y)
+            counts += np.bincount(iy[inside] * bins_x + ix[inside], minlength=bins_y * bins_x)
+        return counts.reshape(bins_y, bins_x).astype(np.float64)
+
+
+def render_png(hist, width, height, max_alpha=180):
+    """
+    Renders a histogram as a width x height BGRA PNG overlay for the location snapshot.
+    Uses a log scale so a few busy cells do not wash out the rest; empty cells are transparent.
+    """
+    scaled = np.log1p(hist)
+    if scaled.max() > 0:
+        scaled /= scaled.max()
+    scaled = cv2.resize(scaled.astype(np.float32), (width, height), interpolation=cv2.INTER_LINEAR)
+    levels = (scaled * 255).astype(np.uint8)
+
+    overlay = cv2.cvtColor(cv2.applyColorMap(levels, cv2.COLORMAP_JET), cv2.COLOR_BGR2BGRA)
+    overlay[:, :, 3] = (np.sqrt(scaled) * max_alpha).astype(np.uint8)
+    ok, buffer = cv2.imencode(".png", overlay)
+    if not ok:
+        raise RuntimeError("Failed to encode heatmap PNG")
+    return buffer.tobytes()
@@ -0,0 +1,111 @@
+import os
+from device.utils.logger import LOG_DIR, LOG_BACKUPS
+
+LOG_PATH = LOG_DIR / "device.log"
+
+
+class LogTailer:
+    """
+    Incremental reads of a rotating log file (see device/utils/logger.py).
+
+    A cursor "<inode>:<offset>" points behind the last line a client has seen. The
+    inode identifies the file across rotations: when device.log has been renamed to
+    device.log.1 meanwhile, the rest of that file is read first and then the newer
+    files from their start. Only complete lines are returned, and at most max_bytes
+    per call, so a client far behind catches up over several calls.
+    """
+    def __init__(self, log_path=LOG_PATH, backups=LOG_BACKUPS):
+        self.log_path = log_path
+        self.backups = backups
+
+    def files(self):
+        """ (inode, path) of the existing log files, oldest first. """
+        paths = [f"{self.log_path}.{i}" for i in range(self.backups, 0, -1)] + [str(self.log_path)]
+        files = []
+        for path in paths:
+            try:
+                files.append((os.stat(path).st_ino, path))
+            except FileNotFoundError:
+                continue
+        return files
+
+    def end_cursor(self):
+        """ Cursor at the current end of the log, None if there is no log yet. """
+        files = self.files()
+        if not files:
+            return None
+        inode, path = files[-1]
+        return f"{inode}:{os.path.getsize(path)}"
+
+    def read(self, cursor=None, max_bytes=256 * 1024):
+        """
+        Lines after cursor, or the last max_bytes of the current file without one.
+        Returns (lines, cursor, more); more is set if reading stopped at max_bytes.
+        A line longer than max_bytes is returned in pieces of max_bytes.
+        A cursor pointing to a file that has been rotated out continues at the oldest file.
+        """
+        files = self.files()
+        if not files:
+            return [], cursor, False
+
+        if cursor is None:
+            inode, path = files[-1]
+            start = max(0, os.path.getsize(path) - max_bytes)
+            data = _read(path, inode, start, max_bytes) or b""
+            if start > 0:
+                # Skip the partial first line
+                skip = data.find(b"\n") + 1
+                data, start = data[skip:], start + skip
+            lines, cursor = _complete_lines(data, inode, start)
+            return lines, cursor, False
+
+        inode, offset = _parse_cursor(cursor)
+        index = next((i for i, (file_inode, _) in enumerate(files) if file_inode == inode), None)
+        if index is None:
+            index, offset = 0, 0
+        elif offset > os.path.getsize(files[index][1]):
+            # Truncated, or a new file that reuses the inode
+            offset = 0
+
+        lines = []
+        budget = max_bytes
+        for file_inode, path in files[index:]:
+            data = _read(path, file_inode, offset, budget)
+            if data is None:
+                # Rotated while reading, the next call picks up from the cursor
+                break
+            file_lines, cursor = _complete_lines(data, file_inode, offset)
+            budget -= len(data)
+            if budget <= 0 and not lines and not file_lines:
+                # A line longer than max_bytes: return this piece of it, the rest comes with the next calls
+                file_lines = [data.decode("utf-8", errors="replace")]
+                cursor = f"{file_inode}:{offset + len(data)}"
+            lines.extend(file_lines)
+            if budget <= 0:
+                return lines, cursor, True
+            offset = 0
+        return lines, cursor, False
+
+
+def _read(path, inode, offset, size):
+    """ Up to size bytes from offset, or None if path is no longer the file with this inode. """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_ino != inode:
+                return None
+            f.seek(offset)
+            return f.read(size)
+    except FileNotFoundError:
+        return None
+
+
+def _complete_lines(data, inode, offset):
+    """ Decoded complete lines of data read at offset and the cursor behind the last one. """
+    end = data.rfind(b"\n") + 1
+    lines = data[:end].decode("utf-8", errors="replace").splitlines()
+    return lines, f"{inode}:{offset + end}"
+
+
+def _parse_cursor(cursor):
+    inode, offset = cursor.split(":")
+    return int(inode), int(offset)
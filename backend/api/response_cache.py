@@ -0,0 +1,105 @@
+import json
+import hashlib
+from starlette.datastructures import Headers
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ResponseCacheMiddleware:
+    """
+    In-process cache for GET endpoints whose data only changes through this API.
+
+    Responses of paths matching cached_paths are kept by path and query string and
+    sent with an ETag; a request whose If-None-Match matches gets an empty 304,
+    otherwise the cached bytes are returned without calling the endpoint.
+    Any write request to a path matching invalidating_paths clears the cache.
+    A path matches if it equals an entry or, for entries ending in "/", starts with it.
+    All other requests, e.g. the streaming endpoints, are passed to the app untouched.
+
+    Responses are only cached if no write finished while they were computed
+    (the generation is unchanged), and error bodies ({"status": "error"}) are not cached.
+    """
+    def __init__(self, app, cached_paths, invalidating_paths):
+        self.app = app
+        self.cached_paths = cached_paths
+        self.invalidating_paths = invalidating_paths
+        self.entries = {}  # key -> (etag, body, headers)
+        self.generation = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path, method = scope["path"], scope["method"]
+        if method in WRITE_METHODS and _matches(path, self.invalidating_paths):
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.invalidate()
+            return
+        if method != "GET" or not _matches(path, self.cached_paths):
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{path}?{scope['query_string'].decode('latin-1')}"
+        entry = self.entries.get(key)
+        if entry is None:
+            generation = self.generation
+            status, headers, body = await self._call_app(scope, receive)
+            if status != 200 or _is_error(body):
+                await _send(send, status, headers, body)
+                return
+            etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            # Clients must revalidate, so a poll after a change never shows stale data
+            headers = [(name, value) for name, value in headers if name.lower() not in (b"etag", b"cache-control")]
+            headers += [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+            entry = (etag, body, headers)
+            if generation == self.generation:
+                self.entries[key] = entry
+
+        etag, body, headers = entry
+        if etag in _if_none_match(scope):
+            await _send(send, 304, [(b"etag", etag.encode()), (b"cache-control", b"no-cache")], b"")
+            return
+        await _send(send, 200, headers, body)
+
+    async def _call_app(self, scope, receive):
+        """ Runs the endpoint and returns its (status, headers, body) instead of sending them. """
+        start = {}
+        chunks = []
+
+        async def collect(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, collect)
+        return start["status"], list(start.get("headers", [])), b"".join(chunks)
+
+    def invalidate(self):
+        self.generation += 1
+        self.entries.clear()
+
+
+async def _send(send, status, headers, body):
+    # Headers of a buffered response already carry its content-length
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _matches(path, patterns):
+    return any(path == pattern or (pattern.endswith("/") and path.startswith(pattern)) for pattern in patterns)
+
+
+def _if_none_match(scope):
+    value = Headers(scope=scope).get("if-none-match", "")
+    return {tag.strip().removeprefix("W/") for tag in value.split(",") if tag.strip()}
+
+
+def _is_error(body):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get("status") == "error"
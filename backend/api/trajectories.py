@@ -0,0 +1,82 @@
+import json
+from itertools import groupby
+import numpy as np
+
+
+def simplify_rdp(points, tolerance):
+    """
+    Ramer-Douglas-Peucker simplification of an (N, 3) array of [t_ms, x, y].
+    Keeps the points needed so no dropped point is further than tolerance pixels from the polyline.
+    Distances are measured to the segment, not the line through it, so a track that doubles back
+    keeps its turning point.
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return points
+
+    xy = points[:, 1:3]
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, direction = xy[first], xy[last] - xy[first]
+        between = xy[first + 1:last] - start
+        length_sq = direction @ direction
+        if length_sq == 0:
+            dist = np.hypot(between[:, 0], between[:, 1])
+        else:
+            # Projection onto the segment, clamped to its end points
+            t = np.clip(between @ direction / length_sq, 0.0, 1.0)
+            offset = between - t[:, None] * direction
+            dist = np.hypot(offset[:, 0], offset[:, 1])
+        farthest = int(dist.argmax())
+        if dist[farthest] > tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return points[keep]
+
+
+def resample(points, interval_ms, max_gap_ms):
+    """
+    Linearly resamples an (N, 3) array of [t_ms, x, y] at multiples of interval_ms.
+    No points are interpolated across gaps longer than max_gap_ms, e.g. while the
+    person was out of view.
+    """
+    t = points[:, 0]
+    grid = np.arange(np.ceil(t[0] / interval_ms) * interval_ms, t[-1] + 1, interval_ms)
+    if len(grid) == 0:
+        return points[:0]
+    after = np.searchsorted(t, grid, side="right")
+    before = np.clip(after - 1, 0, len(t) - 1)
+    after = np.clip(after, 0, len(t) - 1)
+    valid = (t[after] - t[before] <= max_gap_ms) | (t[before] == grid)
+    x = np.interp(grid, t, points[:, 1])
+    y = np.interp(grid, t, points[:, 2])
+    return np.stack([grid, x, y], axis=1)[valid]
+
+
+def trajectory_stream(db_manager, location_id, start_ms, end_ms, object_id=None,
+                      tolerance=0.0, resample_ms=None, max_gap_ms=2000):
+    """
+    Yields one NDJSON line per object: {"object_id": .., "points": [[t_ms, x, y], ...]}.
+    Positions are read in (object, time) order, so only one trajectory is in memory at a time.
+    """
+    rows = db_manager.iter_positions_ordered(location_id, start_ms, end_ms, object_id)
+    for obj_id, track in groupby(rows, key=lambda row: row[0]):
+        points = np.array([row[1:] for row in track], dtype=np.float64)
+        if resample_ms:
+            points = resample(points, resample_ms, max_gap_ms)
+        if tolerance > 0:
+            points = simplify_rdp(points, tolerance)
+        if len(points) == 0:
+            continue
+        line = {
+            "object_id": obj_id,
+            "points": [[int(t), round(x, 1), round(y, 1)] for t, x, y in points.tolist()],
+        }
+        yield json.dumps(line, separators=(",", ":")) + "\n"
@@ -0,0 +1,128 @@
+import os
+import time
+import datetime
+from pathlib import Path
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Layout: <ARCHIVE_DIR>/<kind>/location_id=<id>/date=<YYYY-MM-DD>/part-<ns>.<parquet|npz>
+# Every retention batch writes its own part file; parts of a day are concatenated on read.
+ARCHIVE_DIR = Path(__file__).resolve().parent / "archive"
+
+EVENT_COLUMNS = ("event_id", "object_id", "zone_id", "location_id", "time", "has_helmet", "has_vest")
+POSITION_COLUMNS = ("location_id", "object_id", "t_ms", "x", "y")
+
+# Columns identifying a row, used to drop duplicates of a batch archived twice
+KEY_COLUMNS = {"events": ("event_id",), "positions": ("object_id", "t_ms")}
+
+# zone_id is nullable in the events table; columnar files store it as an integer
+NO_ZONE = -1
+
+
+def write_part(archive_dir, kind, location_id, day, columns):
+    """
+    Writes one part file for a location and day and returns its path.
+    columns: {name: numpy array}, all of the same length.
+    Uses Parquet when pyarrow is installed and compressed NPZ otherwise.
+    """
+    directory = Path(archive_dir) / kind / f"location_id={location_id}" / f"date={day}"
+    directory.mkdir(parents=True, exist_ok=True)
+    suffix = ".parquet" if pa is not None else ".npz"
+    path = directory / f"part-{time.time_ns()}{suffix}"
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    if pa is not None:
+        pq.write_table(pa.table(columns), tmp_path, compression="zstd")
+    else:
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **columns)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_parts(archive_dir, kind, location_id, first_day, last_day):
+    """
+    Reads all archived rows of a location from first_day through last_day (inclusive, YYYY-MM-DD).
+    Returns {name: numpy array}, or None if nothing is archived for that range.
+    """
+    location_dir = Path(archive_dir) / kind / f"location_id={location_id}"
+    parts = []
+    for day in archived_days(archive_dir, kind, location_id, first_day, last_day):
+        for path in sorted((location_dir / f"date={day}").glob("part-*")):
+            if path.suffix == ".parquet":
+                table = pq.read_table(path)
+                parts.append({name: table.column(name).to_numpy() for name in table.column_names})
+            elif path.suffix == ".npz":
+                with np.load(path) as data:
+                    parts.append({name: data[name] for name in data.files})
+    if not parts:
+        return None
+
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    keys = [columns[name] for name in reversed(KEY_COLUMNS[kind])]
+    _, unique = np.unique(np.stack(keys, axis=1), axis=0, return_index=True)
+    return {name: values[np.sort(unique)] for name, values in columns.items()}
+
+
+def archived_days(archive_dir, kind, location_id, first_day, last_day):
+    """ Days (YYYY-MM-DD) from first_day through last_day that have archived rows of a location, oldest first. """
+    location_dir = Path(archive_dir) / kind / f"location_id={location_id}"
+    if not location_dir.is_dir():
+        return []
+    days = [day_dir.name[len("date="):] for day_dir in location_dir.iterdir()]
+    return sorted(day for day in days if first_day <= day <= last_day)
+
+
+def read_events(archive_dir, location_id, start_date, end_date):
+    """ Archived events as dicts shaped like the events table rows, oldest first. """
+    columns = read_parts(archive_dir, "events", location_id, str(start_date), str(end_date))
+    if columns is None:
+        return []
+    order = np.argsort(columns["time"], kind="stable")
+    rows = []
+    for i in order.tolist():
+        row = {name: columns[name][i].item() for name in EVENT_COLUMNS}
+        if row["zone_id"] == NO_ZONE:
+            row["zone_id"] = None
+        rows.append(row)
+    return rows
+
+
+def read_positions(archive_dir, location_id, start_ms, end_ms, object_id=None):
+    """ Archived positions in [start_ms, end_ms) as {name: numpy array}, or None. """
+    first_day = utc_day(start_ms)
+    last_day = utc_day(end_ms - 1)
+    columns = read_parts(archive_dir, "positions", location_id, first_day, last_day)
+    if columns is None:
+        return None
+    return _filter_positions(columns, start_ms, end_ms, object_id)
+
+
+def iter_position_days(archive_dir, location_id, start_ms, end_ms, object_id=None):
+    """
+    Archived positions in [start_ms, end_ms) one day at a time, oldest day first.
+    Yields {name: numpy array} per day, sorted by object and time.
+    """
+    for day in archived_days(archive_dir, "positions", location_id, utc_day(start_ms), utc_day(end_ms - 1)):
+        columns = read_parts(archive_dir, "positions", location_id, day, day)
+        if columns is None:
+            continue
+        columns = _filter_positions(columns, start_ms, end_ms, object_id)
+        order = np.lexsort((columns["t_ms"], columns["object_id"]))
+        yield {name: values[order] for name, values in columns.items()}
+
+
+def _filter_positions(columns, start_ms, end_ms, object_id):
+    keep = (columns["t_ms"] >= start_ms) & (columns["t_ms"] < end_ms)
+    if object_id is not None:
+        keep &= columns["object_id"] == object_id
+    return {name: values[keep] for name, values in columns.items()}
+
+
+def utc_day(t_ms):
+    return datetime.datetime.fromtimestamp(t_ms / 1000, datetime.timezone.utc).date().isoformat()
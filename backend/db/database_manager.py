@@ -1,31 +1,88 @@
 import sqlite3
 import json
+import datetime
+import heapq
+import itertools
+import functools
+import contextlib
 from device.utils.logger import get_logger
+from backend.db.migrations import migrate
+from backend.db.pool import ConnectionPool
+from backend.db import archive
+
+MS_PER_DAY = 86400000
+
+
+def writes(method):
+    """Runs a method that writes under the pool's write lock, on the writer connection."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.pool is None:
+            return method(self, *args, **kwargs)
+        with self.pool.writing():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class DatabaseManager:
-    def __init__(self,db_path):
+    def __init__(self,db_path,partition_positions=False,archive_dir=None,pooled=False):
         self.db_path = db_path
-        self.sqlconn = sqlite3.connect(self.db_path,check_same_thread=False)
-        self.cursor = self.sqlconn.cursor()
-
-        self._configure_pragma()
+        # With archive_dir, reads also return rows the RetentionManager moved out of SQLite
+        self.archive_dir = archive_dir
+        # Write positions into one positions_YYYYMMDD table per UTC day, so old days can be dropped whole
+        self.partition_positions = partition_positions
+        self.position_partitions = set()
+        # pooled: safe to share between threads (the API), see ConnectionPool.
+        # Otherwise one connection and cursor, for a single thread such as the DB worker.
+        self.pool = ConnectionPool(self.db_path) if pooled else None
+        if self.pool is None:
+            self._sqlconn = sqlite3.connect(self.db_path,check_same_thread=False)
+            self._cursor = self._sqlconn.cursor()
+
+        with self.pool.writing() if self.pool is not None else contextlib.nullcontext():
+            self._configure_pragma()
+            migrate(self.sqlconn)
+
+    @property
+    def sqlconn(self):
+        return self._sqlconn if self.pool is None else self.pool.connection()
+
+    @property
+    def cursor(self):
+        return self._cursor if self.pool is None else self.pool.cursor()
 
     def _configure_pragma(self):
         self.cursor.execute("PRAGMA journal_mode=WAL;")
         self.cursor.execute("PRAGMA synchronous=NORMAL;")
         self.sqlconn.commit()
 
-    def insert_object(self,object_id,object_type):
+    @writes
+    def insert_object(self,object_id,object_type,commit=True):
         self.cursor.execute("""INSERT INTO object (object_id,type) VALUES (?,?)""", (object_id,object_type))
-        self.sqlconn.commit()
+        if commit:
+            self.sqlconn.commit()
 
 
-    def insert_events(self,object_id,zone_id,location_id,has_helmet,has_vest,time):
+    @writes
+    def insert_events(self,object_id,zone_id,location_id,has_helmet,has_vest,time,commit=True):
         self.cursor.execute("""INSERT INTO events (object_id,zone_id,location_id,has_helmet,has_vest,time)
         VALUES (?,?,?,?,?,?)""",
         (object_id,zone_id,location_id,has_helmet,has_vest,time))
-        self.sqlconn.commit()
+        self._update_rollups(object_id,zone_id,location_id,has_helmet,has_vest,time)
+        if commit:
+            self.sqlconn.commit()
+
+    def _update_rollups(self,object_id,zone_id,location_id,has_helmet,has_vest,time):
+        """Counts the event in the hourly and daily rollups, in the same transaction as the insert."""
+        self.cursor.execute("SELECT type FROM object WHERE object_id=?", (object_id,))
+        row = self.cursor.fetchone()
+        object_type = row[0] if row else "unknown"
+        zone_id = -1 if zone_id is None else zone_id
+        for table, bucket_column, bucket in (("event_rollup_hourly", "hour", time[:13]), ("event_rollup_daily", "day", time[:10])):
+            self.cursor.execute(f"""INSERT INTO {table} (location_id,{bucket_column},zone_id,object_type,has_helmet,has_vest,events)
+            VALUES (?,?,?,?,?,?,1)
+            ON CONFLICT (location_id,{bucket_column},zone_id,object_type,has_helmet,has_vest) DO UPDATE SET events = events + 1""",
+            (location_id,bucket,zone_id,object_type,has_helmet,has_vest))
 
 
 
@@ -35,13 +92,17 @@ class DatabaseManager:
 
         return rows
 
+    @writes
     def insert_zone(self, points,name,location_id):
         coords_json = json.dumps(points)
         self.cursor.execute("""INSERT INTO zones (coords,name,location_id) VALUES (?,?,?)""", (coords_json,name,location_id))
         self.sqlconn.commit()
 
-    def fetch_all_zones(self, location_id):
-        self.cursor.execute("SELECT * from zones WHERE location_id=?", (location_id,))
+    def fetch_all_zones(self, location_id=None):
+        if location_id is None:
+            self.cursor.execute("SELECT * from zones")
+        else:
+            self.cursor.execute("SELECT * from zones WHERE location_id=?", (location_id,))
         rows = self.cursor.fetchall()
         zones = []
         for row in rows:
@@ -50,9 +111,11 @@ class DatabaseManager:
             zones.append({"zone_id":zone_id,"location_id":location_id,"coords":coords,"name":name})
         return zones
 
-    def set_ai_running(self,value: bool):
+    @writes
+    def set_ai_running(self,value: bool,commit=True):
         self.cursor.execute("UPDATE system_config SET ai_running=? WHERE system_config_id=1",(1 if value else 0,))
-        self.sqlconn.commit()
+        if commit:
+            self.sqlconn.commit()
 
     def get_ai_running(self) -> bool:
         self.cursor.execute("SELECT ai_running FROM system_config WHERE system_config_id=1")
@@ -80,6 +143,7 @@ class DatabaseManager:
         cursor.close()
         return result
 
+    @writes
     def set_active_location(self, location_id):
         """Set a location as active (and deactivate all others)."""
         # Deactivate all locations
@@ -111,18 +175,137 @@ class DatabaseManager:
             return result[0]
         return None
 
+    @writes
     def insert_location(self, name):
         self.cursor.execute("INSERT INTO location (name) VALUES (?)", (name,))
         self.sqlconn.commit()
         return self.cursor.lastrowid
 
-    def insert_object_positions(self, data):
-        self.cursor.executemany("""
-            INSERT INTO object_positions (object_id, location, x, y, time)
-            VALUES (?, ?, ?, ?, ?)
-        """, data)
+    @writes
+    def insert_object_positions(self, data, commit=True):
+        """data: (location_id, object_id, t_ms, x, y) tuples, t_ms in epoch milliseconds."""
+        if not self.partition_positions:
+            self.cursor.executemany("""
+                INSERT OR REPLACE INTO positions (location_id, object_id, t_ms, x, y)
+                VALUES (?, ?, ?, ?, ?)
+            """, data)
+        else:
+            by_day = {}
+            for row in data:
+                by_day.setdefault(row[2] // MS_PER_DAY, []).append(row)
+            for day, rows in by_day.items():
+                table = self._position_partition(day)
+                self.cursor.executemany(f"""
+                    INSERT OR REPLACE INTO {table} (location_id, object_id, t_ms, x, y)
+                    VALUES (?, ?, ?, ?, ?)
+                """, rows)
+        if commit:
+            self.sqlconn.commit()
+
+    def _position_partition(self, day):
+        table = partition_name(day)
+        if table not in self.position_partitions:
+            self.cursor.execute(f"""CREATE TABLE IF NOT EXISTS {table} (location_id INTEGER NOT NULL, object_id INTEGER NOT NULL,
+                t_ms INTEGER NOT NULL, x REAL NOT NULL, y REAL NOT NULL,
+                PRIMARY KEY (location_id, object_id, t_ms)) WITHOUT ROWID""")
+            self.position_partitions.add(table)
+        return table
+
+    def iter_positions(self, location_id, start_ms, end_ms, chunk_size=50000):
+        """
+        Streams positions of a location in [start_ms, end_ms) as lists of at most chunk_size
+        (object_id, t_ms, x, y) tuples, unordered, from the positions tables and the archive.
+        """
+        cursor = self.sqlconn.cursor()
+        for table in self.get_position_tables(start_ms, end_ms):
+            cursor.execute(f"SELECT object_id, t_ms, x, y FROM {table} WHERE location_id = ? AND t_ms >= ? AND t_ms < ?",
+                           (location_id, start_ms, end_ms))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        cursor.close()
+
+        if self.archive_dir is not None:
+            archived = archive.read_positions(self.archive_dir, location_id, start_ms, end_ms)
+            if archived is not None and len(archived["t_ms"]):
+                rows = list(zip(archived["object_id"].tolist(), archived["t_ms"].tolist(),
+                                archived["x"].tolist(), archived["y"].tolist()))
+                # Rows archived but not yet deleted were already returned from the tables above.
+                # Live rows that old only exist while a retention batch is in flight, so this set stays small.
+                live = self._position_keys(location_id, start_ms, int(archived["t_ms"].max()) + 1)
+                if live:
+                    rows = [row for row in rows if row[:2] not in live]
+                for i in range(0, len(rows), chunk_size):
+                    yield rows[i:i + chunk_size]
+
+    def _position_keys(self, location_id, start_ms, end_ms):
+        """(object_id, t_ms) of the live positions of a location in [start_ms, end_ms)."""
+        keys = set()
+        cursor = self.sqlconn.cursor()
+        for table in self.get_position_tables(start_ms, end_ms):
+            cursor.execute(f"SELECT object_id, t_ms FROM {table} WHERE location_id = ? AND t_ms >= ? AND t_ms < ?",
+                           (location_id, start_ms, end_ms))
+            keys.update(cursor.fetchall())
+        cursor.close()
+        return keys
+
+    def iter_positions_ordered(self, location_id, start_ms, end_ms, object_id=None, chunk_size=10000):
+        """
+        Streams positions of a location in [start_ms, end_ms) as (object_id, t_ms, x, y) tuples
+        ordered by object and time. Every positions table is read in primary key order and
+        merged, so only one chunk per table is held in memory. Archived days are separate
+        sources too: each is held as numpy columns (the merge needs all of them at once, unless
+        object_id is given) and turned into Python tuples one chunk at a time.
+        """
+        sources = []
+        for table in self.get_position_tables(start_ms, end_ms):
+            query = f"""SELECT object_id, t_ms, x, y FROM {table} WHERE location_id = ? AND t_ms >= ? AND t_ms < ?
+                ORDER BY object_id, t_ms"""
+            params = (location_id, start_ms, end_ms)
+            if object_id is not None:
+                query = f"""SELECT object_id, t_ms, x, y FROM {table} WHERE location_id = ? AND object_id = ?
+                    AND t_ms >= ? AND t_ms < ? ORDER BY t_ms"""
+                params = (location_id, object_id, start_ms, end_ms)
+            sources.append(_iter_query(self.sqlconn, query, params, chunk_size))
+
+        if self.archive_dir is not None:
+            days = archive.iter_position_days(self.archive_dir, location_id, start_ms, end_ms, object_id)
+            if object_id is not None:
+                # Rows of one object are ordered by time, so the days can be read one after another
+                sources.append(itertools.chain.from_iterable(_iter_columns(columns, chunk_size) for columns in days))
+            else:
+                sources.extend(_iter_columns(columns, chunk_size) for columns in days)
+
+        last_key = None
+        for row in heapq.merge(*sources):
+            # The same row can be both archived and live
+            if row[:2] != last_key:
+                last_key = row[:2]
+                yield row
+
+    def get_position_tables(self, start_ms=None, end_ms=None):
+        """Position tables that may hold rows in [start_ms, end_ms): the main table plus matching day partitions."""
+        cursor = self.sqlconn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name GLOB 'positions_[0-9]*' ORDER BY name")
+        tables = ["positions"]
+        for (name,) in cursor.fetchall():
+            day = partition_day(name)
+            if start_ms is not None and (day + 1) * MS_PER_DAY <= start_ms:
+                continue
+            if end_ms is not None and day * MS_PER_DAY >= end_ms:
+                continue
+            tables.append(name)
+        cursor.close()
+        return tables
+
+    @writes
+    def commit(self):
+        """Commit writes made with commit=False (group commit)."""
         self.sqlconn.commit()
 
+    @writes
     def insert_location_and_activate(self, name):
         """Insert a new location and set it as active."""
         # Deactivate all other locations first
@@ -132,6 +315,7 @@ class DatabaseManager:
         self.sqlconn.commit()
         return self.cursor.lastrowid
 
+    @writes
     def delete_zones_by_location(self, location_id):
         """Delete all zones for a specific location."""
         self.cursor.execute("DELETE FROM zones WHERE location_id = ?", (location_id,))
@@ -163,6 +347,7 @@ class DatabaseManager:
         cursor.close()
         return result
 
+    @writes
     def delete_location(self, location_id):
         """Delete a location and all its zones."""
         # Delete zones first (foreign key constraint)
@@ -176,15 +361,217 @@ class DatabaseManager:
         self.cursor.execute("SELECT * FROM events")
         return self.cursor.fetchall()
 
+    def get_events_page(self, limit, after=None, location_id=None):
+        """
+        One page of events in event_id order (insertion order), using keyset pagination.
+        after: event_id of the last event of the previous page.
+        Returns (rows, next_after), next_after is None on the last page.
+        """
+        cursor = self.sqlconn.cursor()
+        after = after or 0
+        if location_id is None:
+            cursor.execute("SELECT * FROM events WHERE event_id > ? ORDER BY event_id LIMIT ?", (after, limit))
+        else:
+            cursor.execute("SELECT * FROM events WHERE location_id = ? AND event_id > ? ORDER BY event_id LIMIT ?",
+                           (location_id, after, limit))
+        columns = [desc[0] for desc in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        cursor.close()
+        next_after = rows[-1]["event_id"] if len(rows) == limit else None
+        return rows, next_after
+
+    def iter_events(self, location_id=None, start=None, end=None, chunk_size=1000):
+        """
+        Streams events as dicts in chunks of chunk_size, so memory does not grow with the table.
+        start/end are ISO timestamps bounding [start, end); with a location the events come in
+        time order from idx_events_location_time, otherwise in event_id order.
+        Archived events are not included.
+        """
+        conditions, params = [], []
+        if location_id is not None:
+            conditions.append("location_id = ?")
+            params.append(location_id)
+        if start is not None:
+            conditions.append("time >= ?")
+            params.append(local_time(start).isoformat())
+        if end is not None:
+            conditions.append("time < ?")
+            params.append(local_time(end).isoformat())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "time, object_id, zone_id, has_helmet, has_vest, event_id" if location_id is not None else "event_id"
+
+        cursor = self.sqlconn.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM events {where} ORDER BY {order}", params)
+            columns = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            cursor.close()
+
     def get_events_by_date(self, location_id: int, start_date: str, end_date: str):
-        query = """ SELECT * FROM events WHERE location_id = ? AND DATE(time) BETWEEN ? AND ? ORDER BY time"""
+        """Events from start_date through end_date (inclusive days), oldest first."""
+        # Half-open range on the raw ISO timestamps so idx_events_location_time can be used
+        start, end = day_range(start_date, end_date)
+        query = """ SELECT * FROM events WHERE location_id = ? AND time >= ? AND time < ? ORDER BY time"""
 
-        self.cursor.execute(query,(location_id,start_date,end_date))
+        self.cursor.execute(query,(location_id,start,end))
         rows = self.cursor.fetchall()
         columns = [desc[0] for desc in self.cursor.description]
         results = [dict(zip(columns,rows)) for rows in rows]
+
+        if self.archive_dir is not None:
+            archived = archive.read_events(self.archive_dir, location_id, str(start_date)[:10], str(end_date)[:10])
+            if archived:
+                # A batch interrupted between archiving and deleting can be in both places
+                live_ids = {row["event_id"] for row in results}
+                archived = [row for row in archived if row["event_id"] not in live_ids]
+                results = sorted(archived + results, key=lambda row: row["time"])
         return results
 
+    def get_stats(self, location_id, start, end):
+        """
+        Dashboard statistics for [start, end), answered from the event rollups.
+        start/end are ISO timestamps (UTC 'Z' or offsets are converted to local time) and
+        are widened to whole hours. Whole days in the range are read from the daily rollup,
+        so the cost depends on the length of the range but not on the number of events.
+        """
+        start = local_time(start).replace(minute=0, second=0, microsecond=0)
+        end = local_time(end)
+        if end != end.replace(minute=0, second=0, microsecond=0):
+            end = end.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+        hourly_series = end - start <= datetime.timedelta(hours=48)
+
+        hour_ranges = [(start, end)]
+        full_days = None
+        if not hourly_series:
+            first_day = start.replace(hour=0)
+            if first_day < start:
+                first_day += datetime.timedelta(days=1)
+            last_day = end.replace(hour=0)
+            if first_day < last_day:
+                hour_ranges = [(start, first_day), (last_day, end)]
+                full_days = (first_day, last_day)
+
+        rows = []
+        cursor = self.sqlconn.cursor()
+        for range_start, range_end in hour_ranges:
+            cursor.execute("""SELECT hour, zone_id, object_type, has_helmet, has_vest, events FROM event_rollup_hourly
+                WHERE location_id = ? AND hour >= ? AND hour < ?""",
+                (location_id, range_start.isoformat()[:13], range_end.isoformat()[:13]))
+            rows.extend(cursor.fetchall())
+        if full_days is not None:
+            cursor.execute("""SELECT day, zone_id, object_type, has_helmet, has_vest, events FROM event_rollup_daily
+                WHERE location_id = ? AND day >= ? AND day < ?""",
+                (location_id, full_days[0].isoformat()[:10], full_days[1].isoformat()[:10]))
+            rows.extend(cursor.fetchall())
+        cursor.close()
+
+        stats = {"detectedPersons": 0, "detectedVehicles": 0, "ppeBreaches": 0, "forbiddenZoneEntries": 0}
+        compliance = {"compliant": 0, "missingHardHat": 0, "missingVest": 0, "missingBoth": 0}
+        zone_entries = {}
+        series = {}
+        for bucket, zone_id, object_type, has_helmet, has_vest, events in rows:
+            # Hour buckets are YYYY-MM-DDTHH, day buckets YYYY-MM-DD
+            bucket = bucket[:13] if hourly_series else bucket[:10]
+            point = series.setdefault(bucket, {"persons": 0, "vehicles": 0, "ppeBreaches": 0, "zoneEntries": 0})
+            is_person = object_type == "Person"
+            if zone_id == -1:
+                # Every new track creates one event without a zone
+                if is_person:
+                    stats["detectedPersons"] += events
+                    point["persons"] += events
+                elif object_type.lower() == "vehicle":
+                    stats["detectedVehicles"] += events
+                    point["vehicles"] += events
+            else:
+                stats["forbiddenZoneEntries"] += events
+                point["zoneEntries"] += events
+                zone_entries[zone_id] = zone_entries.get(zone_id, 0) + events
+            if is_person:
+                if has_helmet and has_vest:
+                    compliance["compliant"] += events
+                else:
+                    stats["ppeBreaches"] += events
+                    point["ppeBreaches"] += events
+                    key = "missingBoth" if not (has_helmet or has_vest) else "missingHardHat" if not has_helmet else "missingVest"
+                    compliance[key] += events
+
+        return {
+            "location_id": location_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "bucket": "hour" if hourly_series else "day",
+            **stats,
+            "ppeCompliance": compliance,
+            "zoneEntries": zone_entries,
+            # Bucket start as a naive local ISO timestamp
+            "series": [{"bucket": _bucket_start(bucket), **point} for bucket, point in sorted(series.items())],
+        }
+
     def __del__(self):
-        if hasattr(self, "sqlconn"):
-            self.sqlconn.close()
+        if getattr(self, "pool", None) is not None:
+            self.pool.close()
+        elif hasattr(self, "_sqlconn"):
+            self._sqlconn.close()
+
+
+def day_range(start_date, end_date):
+    """
+    Converts inclusive start/end days to a half-open [start, end) range of ISO timestamp
+    strings, which compares correctly against the stored isoformat() times.
+    Accepts dates or full ISO timestamps (as sent by the frontend); only the day is used.
+    """
+    start = datetime.date.fromisoformat(str(start_date)[:10])
+    end = datetime.date.fromisoformat(str(end_date)[:10]) + datetime.timedelta(days=1)
+    return start.isoformat(), end.isoformat()
+
+
+def partition_name(day):
+    """ Table name of the positions partition for a UTC day number (days since the epoch). """
+    return "positions_" + (datetime.date(1970, 1, 1) + datetime.timedelta(days=day)).strftime("%Y%m%d")
+
+
+def partition_day(table):
+    date = datetime.datetime.strptime(table[len("positions_"):], "%Y%m%d").date()
+    return (date - datetime.date(1970, 1, 1)).days
+
+
+def local_time(value):
+    """ Parses an ISO date or timestamp to a naive local datetime, like the stored event times. """
+    value = datetime.datetime.fromisoformat(str(value))
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _iter_query(sqlconn, query, params, chunk_size):
+    cursor = sqlconn.cursor()
+    cursor.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def _iter_columns(columns, chunk_size):
+    """ Rows of sorted archive columns as (object_id, t_ms, x, y) tuples, converted chunk by chunk. """
+    for start in range(0, len(columns["t_ms"]), chunk_size):
+        chunk = [columns[name][start:start + chunk_size].tolist() for name in ("object_id", "t_ms", "x", "y")]
+        yield from zip(*chunk)
+
+
+def epoch_ms(value):
+    """ Epoch milliseconds of an ISO date or timestamp; naive values are local time. """
+    return int(local_time(value).timestamp() * 1000)
+
+
+def _bucket_start(bucket):
+    return bucket + (":00:00" if len(bucket) == 13 else "T00:00:00")
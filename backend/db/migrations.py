@@ -0,0 +1,107 @@
+import sqlite3
+from device.utils.logger import get_logger
+
+logger = get_logger("DB")
+
+# Versioned schema changes, applied in order. The current version is stored in PRAGMA user_version.
+# Never edit a released migration; append a new one instead.
+MIGRATIONS = [
+    (1, "base schema", [
+        """CREATE TABLE IF NOT EXISTS events (event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        object_id INTEGER NOT NULL,zone_id INTEGER,location_id INTEGER NOT NULL,
+        time TEXT NOT NULL,
+        has_helmet INTEGER NOT NULL DEFAULT 0 CHECK(has_helmet IN (0,1)),has_vest INTEGER NOT NULL DEFAULT 0 CHECK(has_vest IN (0,1)),
+        FOREIGN KEY (zone_id) REFERENCES zones (zone_id),FOREIGN KEY (location_id) REFERENCES location (location_id))""",
+        """CREATE TABLE IF NOT EXISTS zones (zone_id INTEGER PRIMARY KEY AUTOINCREMENT,location_id INTEGER NOT NULL,coords TEXT NOT NULL,name TEXT NOT NULL,
+        FOREIGN KEY (location_id) REFERENCES location (location_id))""",
+        "CREATE TABLE IF NOT EXISTS object (object_id INTEGER PRIMARY KEY ,type TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS location (location_id INTEGER PRIMARY KEY AUTOINCREMENT,name TEXT NOT NULL,is_active INTEGER NOT NULL DEFAULT 0 CHECK(is_active IN (0,1)))",
+        "CREATE TABLE IF NOT EXISTS system_config (system_config_id INTEGER PRIMARY KEY AUTOINCREMENT, ai_running INTEGER NOT NULL DEFAULT 0 CHECK(ai_running IN (0,1)))",
+        "CREATE TABLE IF NOT EXISTS object_positions (id INTEGER PRIMARY KEY AUTOINCREMENT, object_id INTEGER NOT NULL, location TEXT, x REAL NOT NULL, y REAL NOT NULL, time REAL NOT NULL)",
+    ]),
+    (2, "indexes for time-range and per-location queries", [
+        # Covers SELECT * FROM events WHERE location_id = ? AND time >= ? AND time < ? ORDER BY time
+        # (event_id is the rowid and always part of the index)
+        "CREATE INDEX IF NOT EXISTS idx_events_location_time ON events (location_id, time, object_id, zone_id, has_helmet, has_vest)",
+        # Covers trajectories of one object over a time range
+        "CREATE INDEX IF NOT EXISTS idx_object_positions_object_time ON object_positions (object_id, time, x, y)",
+        # Zones are few and carry their JSON coords, so a plain index is enough to avoid the table scan
+        "CREATE INDEX IF NOT EXISTS idx_zones_location ON zones (location_id)",
+    ]),
+    (3, "compact positions table", [
+        # Clustered on (location, object, time): a trajectory is one contiguous range of the b-tree
+        """CREATE TABLE IF NOT EXISTS positions (location_id INTEGER NOT NULL, object_id INTEGER NOT NULL,
+        t_ms INTEGER NOT NULL, x REAL NOT NULL, y REAL NOT NULL,
+        PRIMARY KEY (location_id, object_id, t_ms)) WITHOUT ROWID""",
+        # Old rows hold naive local ISO strings and the placeholder location "loc", which becomes location 0
+        """INSERT OR REPLACE INTO positions (location_id, object_id, t_ms, x, y)
+        SELECT CASE WHEN CAST(location AS INTEGER) || '' = location THEN CAST(location AS INTEGER) ELSE 0 END,
+               object_id,
+               CASE WHEN typeof(time) = 'text' THEN CAST(round((julianday(time, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+                    ELSE CAST(round(time * 1000) AS INTEGER) END,
+               x, y
+        FROM object_positions WHERE julianday(time) IS NOT NULL OR typeof(time) != 'text'""",
+        "DROP TABLE object_positions",
+        # Read-only view in the old shape, with time as epoch seconds
+        """CREATE VIEW object_positions AS
+        SELECT object_id, location_id AS location, x, y, t_ms / 1000.0 AS time FROM positions""",
+    ]),
+    (4, "hourly and daily event rollups", [
+        # Event counts per location, bucket, zone (-1 = none), object type and PPE status.
+        # Buckets are prefixes of the naive local event time: YYYY-MM-DDTHH for hours, YYYY-MM-DD for days.
+        """CREATE TABLE IF NOT EXISTS event_rollup_hourly (location_id INTEGER NOT NULL, hour TEXT NOT NULL,
+        zone_id INTEGER NOT NULL, object_type TEXT NOT NULL, has_helmet INTEGER NOT NULL, has_vest INTEGER NOT NULL,
+        events INTEGER NOT NULL,
+        PRIMARY KEY (location_id, hour, zone_id, object_type, has_helmet, has_vest)) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS event_rollup_daily (location_id INTEGER NOT NULL, day TEXT NOT NULL,
+        zone_id INTEGER NOT NULL, object_type TEXT NOT NULL, has_helmet INTEGER NOT NULL, has_vest INTEGER NOT NULL,
+        events INTEGER NOT NULL,
+        PRIMARY KEY (location_id, day, zone_id, object_type, has_helmet, has_vest)) WITHOUT ROWID""",
+        # Backfill from the events still in the database
+        """INSERT INTO event_rollup_hourly
+        SELECT e.location_id, substr(e.time, 1, 13), COALESCE(e.zone_id, -1), COALESCE(o.type, 'unknown'),
+               e.has_helmet, e.has_vest, COUNT(*)
+        FROM events e LEFT JOIN object o ON o.object_id = e.object_id
+        GROUP BY 1, 2, 3, 4, 5, 6""",
+        """INSERT INTO event_rollup_daily
+        SELECT location_id, substr(hour, 1, 10), zone_id, object_type, has_helmet, has_vest, SUM(events)
+        FROM event_rollup_hourly
+        GROUP BY 1, 2, 3, 4, 5, 6""",
+    ]),
+    (5, "index for paging events of a location", [
+        # (location_id, rowid): keyset pages on event_id within a location without sorting
+        "CREATE INDEX IF NOT EXISTS idx_events_location ON events (location_id)",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(sqlconn):
+    return sqlconn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(sqlconn):
+    """
+    Brings the database up to SCHEMA_VERSION.
+    Each migration runs in its own IMMEDIATE transaction, so the API and the device
+    runtime can both call this on startup without applying a migration twice.
+    """
+    if get_version(sqlconn) >= SCHEMA_VERSION:
+        return
+
+    for version, description, statements in MIGRATIONS:
+        sqlconn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read inside the write lock, another connection may have migrated meanwhile
+            if get_version(sqlconn) >= version:
+                sqlconn.rollback()
+                continue
+            for statement in statements:
+                sqlconn.execute(statement)
+            sqlconn.execute(f"PRAGMA user_version = {version}")
+            sqlconn.commit()
+            logger.info(f"Applied schema migration {version}: {description}")
+        except sqlite3.Error:
+            sqlconn.rollback()
+            raise
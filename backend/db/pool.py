@@ -0,0 +1,72 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    SQLite connections for a multi-threaded server.
+
+    Every thread reads through its own read-only connection, so concurrent requests
+    need no global lock and reads do not wait behind a write (WAL lets readers run
+    next to the writer). All writes go through one writer connection, serialized by
+    a lock that a thread holds inside writing(). connection() and cursor() return
+    the writer while the calling thread is writing and its reader otherwise.
+
+    This makes sharing a DatabaseManager between threads safe; it does not add
+    throughput for requests that are mostly Python work under the GIL
+    (see benchmarks/bench_api_concurrency.py).
+
+    Readers are opened with check_same_thread=False because a streaming response
+    may resume a generator, and with it a cursor, on another worker thread.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.writer = sqlite3.connect(db_path, check_same_thread=False)
+        self.writer_cursor = self.writer.cursor()
+        self.write_lock = threading.RLock()
+        self.local = threading.local()
+        self.readers = []
+        self.readers_lock = threading.Lock()
+
+    def connection(self):
+        if getattr(self.local, "writing", 0):
+            return self.writer
+        return self._reader()[0]
+
+    def cursor(self):
+        if getattr(self.local, "writing", 0):
+            return self.writer_cursor
+        return self._reader()[1]
+
+    def _reader(self):
+        reader = getattr(self.local, "reader", None)
+        if reader is None:
+            sqlconn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            reader = (sqlconn, sqlconn.cursor())
+            self.local.reader = reader
+            with self.readers_lock:
+                self.readers.append(sqlconn)
+        return reader
+
+    @contextmanager
+    def writing(self):
+        """ Holds the write lock; nested use on the same thread is allowed. """
+        with self.write_lock:
+            self.local.writing = getattr(self.local, "writing", 0) + 1
+            try:
+                yield self.writer
+            except Exception:
+                # Do not leave a half-done transaction for the next writer to commit
+                if self.local.writing == 1 and self.writer.in_transaction:
+                    self.writer.rollback()
+                raise
+            finally:
+                self.local.writing -= 1
+
+    def close(self):
+        with self.readers_lock:
+            for sqlconn in self.readers:
+                sqlconn.close()
+            self.readers.clear()
+        self.writer.close()
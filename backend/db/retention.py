@@ -0,0 +1,141 @@
+import time
+import datetime
+import numpy as np
+from backend.db.archive import ARCHIVE_DIR, EVENT_COLUMNS, POSITION_COLUMNS, NO_ZONE, write_part, utc_day
+from backend.db.database_manager import DatabaseManager, MS_PER_DAY
+from device.utils.logger import get_logger
+
+logger = get_logger("DB")
+
+
+class RetentionManager:
+    """
+    Moves events and object positions older than max_age_days from SQLite into
+    columnar archive files (see archive.py), partitioned by location and day.
+
+    Works in batches of at most batch_size rows: each batch is written to its own
+    part file first and then deleted in a short transaction, so writers never wait
+    for more than one batch. Expired day partitions of the positions table are
+    archived the same way and then dropped whole.
+    Uses its own connection and is meant to run in a background thread.
+    """
+    def __init__(self, db_path, archive_dir=ARCHIVE_DIR, max_age_days=30, batch_size=5000, pause=0.05):
+        self.db_manager = DatabaseManager(db_path)
+        self.archive_dir = archive_dir
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        self.pause = pause  # seconds between batches, gives writers the lock
+
+    def run(self, stop_event, interval=3600):
+        while not stop_event.is_set():
+            try:
+                self.run_once(stop_event)
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+            stop_event.wait(interval)
+
+    def run_once(self, stop_event=None):
+        """ Archives everything that has expired. Returns (events, positions) archived. """
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=self.max_age_days)
+        # Events are cut at local midnight (their times are naive local), positions at UTC midnight
+        cutoff_time = cutoff.date().isoformat()
+        cutoff_ms = int(cutoff.timestamp() * 1000) // MS_PER_DAY * MS_PER_DAY
+
+        events = self._archive_events(cutoff_time, stop_event)
+        positions = 0
+        for table in self.db_manager.get_position_tables(end_ms=cutoff_ms):
+            positions += self._archive_positions(table, cutoff_ms, stop_event)
+        if events or positions:
+            logger.info(f"Archived {events} events and {positions} positions older than {cutoff_time}")
+        return events, positions
+
+    def _archive_events(self, cutoff_time, stop_event):
+        cursor = self.db_manager.sqlconn.cursor()
+        cursor.execute("SELECT DISTINCT location_id FROM events")
+        location_ids = [row[0] for row in cursor.fetchall()]
+
+        archived = 0
+        for location_id in location_ids:
+            while not _stopped(stop_event):
+                cursor.execute(f"""SELECT {", ".join(EVENT_COLUMNS)} FROM events
+                    WHERE location_id = ? AND time < ? ORDER BY time LIMIT ?""",
+                               (location_id, cutoff_time, self.batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                columns = dict(zip(EVENT_COLUMNS, map(list, zip(*rows))))
+                columns["zone_id"] = [NO_ZONE if zone_id is None else zone_id for zone_id in columns["zone_id"]]
+                columns = {name: np.array(values) for name, values in columns.items()}
+                days = np.array([t[:10] for t in columns["time"].tolist()])
+                for day in np.unique(days).tolist():
+                    in_day = days == day
+                    write_part(self.archive_dir, "events", location_id, day,
+                               {name: values[in_day] for name, values in columns.items()})
+
+                cursor.executemany("DELETE FROM events WHERE event_id = ?", [(row[0],) for row in rows])
+                self.db_manager.commit()
+                archived += len(rows)
+                time.sleep(self.pause)
+        cursor.close()
+        return archived
+
+    def _archive_positions(self, table, cutoff_ms, stop_event):
+        """
+        Archives rows of one positions table older than cutoff_ms, in primary key order.
+        A day partition is dropped once it is empty.
+        """
+        cursor = self.db_manager.sqlconn.cursor()
+        partition = table != "positions"
+        archived = 0
+        # Keyset over the primary key (location_id, object_id, t_ms)
+        last_key = (-1, -1, -1)
+        while not _stopped(stop_event):
+            cursor.execute(f"""SELECT {", ".join(POSITION_COLUMNS)} FROM {table}
+                WHERE (location_id, object_id, t_ms) > (?, ?, ?) AND t_ms < ?
+                ORDER BY location_id, object_id, t_ms LIMIT ?""",
+                           last_key + (cutoff_ms, self.batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_key = rows[-1][:3]
+            self._write_positions(rows)
+
+            # Rows are ordered by the primary key, so delete per (location, object) up to the last archived time
+            last_times = {}
+            for location_id, object_id, t_ms, _, _ in rows:
+                last_times[(location_id, object_id)] = t_ms
+            cursor.executemany(f"DELETE FROM {table} WHERE location_id = ? AND object_id = ? AND t_ms <= ?",
+                               [(location_id, object_id, t_ms) for (location_id, object_id), t_ms in last_times.items()])
+            self.db_manager.commit()
+            archived += len(rows)
+            time.sleep(self.pause)
+
+        if partition and not _stopped(stop_event):
+            cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute(f"DROP TABLE {table}")
+                self.db_manager.commit()
+                self.db_manager.position_partitions.discard(table)
+        cursor.close()
+        return archived
+
+    def _write_positions(self, rows):
+        location_ids, object_ids, t_ms, x, y = zip(*rows)
+        columns = {
+            "location_id": np.array(location_ids, dtype=np.int64),
+            "object_id": np.array(object_ids, dtype=np.int64),
+            "t_ms": np.array(t_ms, dtype=np.int64),
+            "x": np.array(x, dtype=np.float64),
+            "y": np.array(y, dtype=np.float64),
+        }
+        days = columns["t_ms"] // MS_PER_DAY
+        groups = np.stack([columns["location_id"], days], axis=1)
+        for location_id, day in np.unique(groups, axis=0).tolist():
+            selected = (columns["location_id"] == location_id) & (days == day)
+            write_part(self.archive_dir, "positions", location_id, utc_day(day * MS_PER_DAY),
+                       {name: values[selected] for name, values in columns.items()})
+
+
+def _stopped(stop_event):
+    return stop_event is not None and stop_event.is_set()
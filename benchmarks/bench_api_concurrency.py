@@ -0,0 +1,126 @@
+"""
+Concurrency load test of the API's database access.
+
+N client threads issue the requests the dashboard makes (events of a day range,
+stats, a page of events, the system status, and now and then a write) against one
+shared DatabaseManager, like the FastAPI thread pool does, for a fixed duration.
+Compares one connection shared by all threads with the pooled manager (per-thread
+read-only connections plus one serialized writer) and reports requests per second
+and failed requests per client count. Unguarded concurrent use of the shared
+connection and cursor can crash the interpreter, so the shared baseline runs every
+request under a lock, which is the most the single connection allows.
+
+Measured result: pooling does not raise throughput. These requests spend most of
+their time in Python (building rows and stats) under the GIL, so both variants stay
+roughly flat or drop as clients are added; one run gave 2001/1882/1436 req/s
+pooled vs. 2113/1682/1974 shared at 1/4/8 clients. What the pool buys is that
+concurrent requests are safe without a global lock and reads do not queue behind
+writes on one connection, not more requests per second.
+
+usage: python -m benchmarks.bench_api_concurrency [--clients 1 2 4 8 16] [--seconds 3] [--events 50000]
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import threading
+import time
+from backend.db.database_manager import DatabaseManager
+
+START = datetime.datetime(2025, 1, 1)
+DAYS = 30
+WRITE_SHARE = 0.02
+
+
+def fill(db_path, events):
+    db_manager = DatabaseManager(db_path)
+    db_manager.insert_location("bench")
+    db_manager.cursor.execute("INSERT INTO system_config (ai_running) VALUES (0)")
+    for object_id in range(500):
+        db_manager.insert_object(object_id, "Person" if object_id % 4 else "Vehicle", commit=False)
+    step = DAYS * 86400 / events
+    for i in range(events):
+        time_ = (START + datetime.timedelta(seconds=i * step)).isoformat()
+        db_manager.insert_events(i % 500, None if i % 3 else 1, 1, i % 2, i % 5 != 0, time_, commit=False)
+    db_manager.commit()
+    db_manager.cursor.execute("ANALYZE")
+    db_manager.sqlconn.close()
+
+
+def request(db_manager, rng):
+    if rng.random() < WRITE_SHARE:
+        db_manager.set_ai_running(rng.random() < 0.5)
+        return
+    kind = rng.randrange(4)
+    day = START + datetime.timedelta(days=rng.randrange(DAYS - 1))
+    if kind == 0:
+        db_manager.get_events_by_date(1, day.date().isoformat(), day.date().isoformat())
+    elif kind == 1:
+        db_manager.get_stats(1, day.isoformat(), (day + datetime.timedelta(days=7)).isoformat())
+    elif kind == 2:
+        db_manager.get_events_page(500, rng.randrange(1000), 1)
+    else:
+        db_manager.get_ai_running()
+
+
+class Serialized:
+    """ One request at a time on a shared DatabaseManager. """
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        method = getattr(self.db_manager, name)
+
+        def locked(*args, **kwargs):
+            with self.lock:
+                return method(*args, **kwargs)
+        return locked
+
+
+def run(db_manager, clients, seconds):
+    counts = [0] * clients
+    errors = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            try:
+                request(db_manager, rng)
+                counts[index] += 1
+            except Exception:
+                errors[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start), sum(errors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench.db")
+        fill(db_path, args.events)
+        managers = {
+            "shared": Serialized(DatabaseManager(db_path)),
+            "pooled": DatabaseManager(db_path, pooled=True),
+        }
+
+        print(f"{args.events} events, {args.seconds:.0f}s per run, {WRITE_SHARE:.0%} writes")
+        print(f"{'clients':>8} " + " ".join(f"{name + ' req/s':>14} {'errors':>7}" for name in managers))
+        for clients in args.clients:
+            results = [run(db_manager, clients, args.seconds) for db_manager in managers.values()]
+            print(f"{clients:>8} " + " ".join(f"{rate:>14.0f} {errors:>7}" for rate, errors in results))
+        managers.clear()
+    print("Throughput is GIL-bound; compare errors and the trend, not a speedup (see the module docstring)")
@@ -0,0 +1,109 @@
+"""
+Benchmark of frame-time jitter with the DB worker as a thread vs. a separate process.
+
+A simulated vision loop does a fixed amount of Python work per frame and sends the
+same messages as EventManager: an event per frame, object positions for every
+track, flushed in batches of 100, and a status read every few frames.
+
+usage: python -m benchmarks.bench_db_jitter [--frames 600] [--tracks 30] [--group_commit]
+"""
+import argparse
+import datetime
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from backend.db.init_db import create_schema
+from device.utils.db_process import DBProcess
+from device.utils.db_worker import db_worker
+from device.utils.journal import JournaledQueue
+
+FRAME_WORK = 20000  # iterations of Python work per frame, ~ the tracker and event logic
+CHECK_INTERVAL = 5
+
+
+def simulate_frame_work(iterations):
+    total = 0
+    for i in range(iterations):
+        total += i * i % 7
+    return total
+
+
+def run_loop(db_queue, frames, tracks):
+    response_queue = queue.Queue()
+    positions = []
+    frame_times = []
+    for frame_id in range(frames):
+        start = time.perf_counter()
+        simulate_frame_work(FRAME_WORK)
+
+        now = datetime.datetime.now().isoformat()
+        db_queue.enqueue({"action": "insert_event", "object_id": frame_id, "zone_id": None, "location": 1,
+                          "helmet": True, "vest": False, "time": now})
+        for track_id in range(tracks):
+            positions.append({"object_id": track_id, "location": 1, "x": 10.0 * track_id, "y": 5.0,
+                              "t_ms": int(time.time() * 1000)})
+        if len(positions) > 100:
+            db_queue.enqueue({"action": "insert_object_positions", "data": positions.copy()})
+            positions.clear()
+
+        if frame_id % CHECK_INTERVAL == 0:
+            db_queue.enqueue({"action": "get_status", "response": response_queue})
+            try:
+                response_queue.get_nowait()
+            except queue.Empty:
+                pass
+        frame_times.append((time.perf_counter() - start) * 1000)
+    return frame_times
+
+
+def run(mode, frames, tracks, group_commit, tmp_dir):
+    db_path = os.path.join(tmp_dir, f"{mode}.db")
+    create_schema(db_path)
+    db_queue = JournaledQueue(maxsize=100, journal_path=os.path.join(tmp_dir, f"{mode}_journal.jsonl"))
+    stop_event = threading.Event()
+
+    if mode == "process":
+        worker = DBProcess(db_queue, db_path=db_path, group_commit=group_commit)
+        worker.start()
+        time.sleep(1.0)  # let the spawned interpreter finish its imports
+    else:
+        worker = threading.Thread(target=db_worker, args=(db_queue, stop_event, db_path),
+                                  kwargs={"group_commit": group_commit})
+        worker.start()
+
+    frame_times = run_loop(db_queue, frames, tracks)
+
+    stop_event.set()
+    if mode == "process":
+        worker.stop()
+    else:
+        worker.join()
+    db_queue.close()
+    return frame_times
+
+
+def report(mode, frame_times):
+    frame_times = sorted(frame_times)
+    p99 = frame_times[int(len(frame_times) * 0.99) - 1]
+    print(f"{mode:>8} {statistics.mean(frame_times):>9.2f} {statistics.stdev(frame_times):>9.2f} "
+          f"{p99:>9.2f} {frame_times[-1]:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--tracks", type=int, default=30)
+    parser.add_argument("--group_commit", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {mode: run(mode, args.frames, args.tracks, args.group_commit, tmp_dir)
+                   for mode in ("thread", "process")}
+
+    print(f"frame time (ms), {args.frames} frames, {args.tracks} tracks, group commit: {args.group_commit}")
+    print(f"{'':>8} {'mean':>9} {'stdev':>9} {'p99':>9} {'max':>9}")
+    for mode, frame_times in results.items():
+        report(mode, frame_times)
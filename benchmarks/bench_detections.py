@@ -0,0 +1,63 @@
+"""
+Microbenchmark of the detection hand-off from the detector to the tracker.
+
+Compares the list-of-tuples path (run_inference + class-name filter + DetectionResults)
+with the array-native path (run_inference_array + class-id mask + DetectionResults.from_array).
+The model is replaced by a stub returning precomputed boxes, so only the hand-off is measured.
+
+usage: python -m benchmarks.bench_detections
+"""
+import time
+from types import SimpleNamespace
+import numpy as np
+import torch
+from device.inference.inference import run_inference, run_inference_array
+from device.inference.tracker import DetectionResults
+
+
+class StubModel:
+    def __init__(self, num_detections, num_classes=2):
+        xywh = torch.rand(num_detections, 4) * 640
+        conf = torch.rand(num_detections) * 0.5 + 0.5
+        cls = torch.randint(0, num_classes, (num_detections,)).float()
+        self.results = [SimpleNamespace(boxes=SimpleNamespace(xywh=xywh, conf=conf, cls=cls))]
+
+    def predict(self, frame, **kwargs):
+        return self.results
+
+
+def list_path(frame, model, class_names, trackable_classes):
+    detections = run_inference(frame, model)
+    detections_for_tracking = [d for d in detections if class_names[d[-1]] in trackable_classes]
+    return DetectionResults(detections_for_tracking)
+
+
+def array_path(frame, model, trackable_class_ids):
+    detections = run_inference_array(frame, model)
+    keep = np.isin(detections[:, 5], trackable_class_ids)
+    if not keep.all():
+        detections = detections[keep]
+    return DetectionResults.from_array(detections)
+
+
+def bench(fn, iterations):
+    for _ in range(10):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    class_names = {0: "Person", 1: "Hardhat"}
+    trackable_classes = ["Person", "vehicle"]
+    trackable_class_ids = np.array([i for i, n in class_names.items() if n in trackable_classes], dtype=np.float32)
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    print(f"{'detections':>10} {'list path (us)':>15} {'array path (us)':>16} {'speedup':>8}")
+    for num_detections in (1, 20, 100):
+        model = StubModel(num_detections)
+        list_us = bench(lambda: list_path(frame, model, class_names, trackable_classes), 2000)
+        array_us = bench(lambda: array_path(frame, model, trackable_class_ids), 2000)
+        print(f"{num_detections:>10} {list_us:>15.1f} {array_us:>16.1f} {list_us / array_us:>7.1f}x")
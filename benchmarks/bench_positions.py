@@ -0,0 +1,92 @@
+"""
+Benchmark of object position storage: the former object_positions table (ISO time
+strings, "loc" text, rowid table plus index) vs. the compact WITHOUT ROWID positions
+table, with and without per-day partitions.
+
+Reports insert throughput with the device's batch size of ~100 rows and the
+resulting database size.
+
+usage: python -m benchmarks.bench_positions [--rows 200000] [--tracks 40]
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import tempfile
+import time
+from backend.db.database_manager import DatabaseManager
+
+BATCH_SIZE = 100
+FPS = 10
+
+
+def generate(rows, tracks):
+    """ Position rows as the device produces them: every track once per frame at FPS. """
+    start_ms = int(datetime.datetime(2025, 1, 1, 22).timestamp() * 1000)
+    data = []
+    for i in range(rows):
+        frame, track_id = divmod(i, tracks)
+        data.append((1, track_id, start_ms + frame * 1000 // FPS, 100.0 + frame % 640, 200.0 + track_id))
+    return data
+
+
+def db_size(sqlconn):
+    sqlconn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    page_count = sqlconn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = sqlconn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def bench_legacy(db_path, data):
+    sqlconn = sqlite3.connect(db_path)
+    sqlconn.execute("PRAGMA journal_mode=WAL")
+    sqlconn.execute("PRAGMA synchronous=NORMAL")
+    sqlconn.execute("CREATE TABLE object_positions (id INTEGER PRIMARY KEY AUTOINCREMENT, object_id INTEGER NOT NULL, "
+                    "location TEXT, x REAL NOT NULL, y REAL NOT NULL, time REAL NOT NULL)")
+    sqlconn.execute("CREATE INDEX idx_object_positions_object_time ON object_positions (object_id, time, x, y)")
+    legacy = [(object_id, "loc", x, y, datetime.datetime.fromtimestamp(t_ms / 1000).isoformat())
+              for _, object_id, t_ms, x, y in data]
+
+    start = time.perf_counter()
+    for i in range(0, len(legacy), BATCH_SIZE):
+        sqlconn.executemany("INSERT INTO object_positions (object_id, location, x, y, time) VALUES (?, ?, ?, ?, ?)",
+                            legacy[i:i + BATCH_SIZE])
+        sqlconn.commit()
+    elapsed = time.perf_counter() - start
+    size = db_size(sqlconn)
+    sqlconn.close()
+    return elapsed, size
+
+
+def bench_compact(db_path, data, partition_positions):
+    db_manager = DatabaseManager(db_path, partition_positions=partition_positions)
+    base_size = db_size(db_manager.sqlconn)
+
+    start = time.perf_counter()
+    for i in range(0, len(data), BATCH_SIZE):
+        db_manager.insert_object_positions(data[i:i + BATCH_SIZE])
+    elapsed = time.perf_counter() - start
+    # Only count what the positions take, not the rest of the schema
+    size = db_size(db_manager.sqlconn) - base_size
+    db_manager.sqlconn.close()
+    return elapsed, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--tracks", type=int, default=40)
+    args = parser.parse_args()
+
+    data = generate(args.rows, args.tracks)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {
+            "legacy": bench_legacy(os.path.join(tmp_dir, "legacy.db"), data),
+            "compact": bench_compact(os.path.join(tmp_dir, "compact.db"), data, False),
+            "partitioned": bench_compact(os.path.join(tmp_dir, "partitioned.db"), data, True),
+        }
+
+    print(f"{args.rows} rows, {args.tracks} tracks, batches of {BATCH_SIZE}")
+    print(f"{'':>12} {'rows/s':>10} {'size (MB)':>10} {'bytes/row':>10}")
+    for name, (elapsed, size) in results.items():
+        print(f"{name:>12} {args.rows / elapsed:>10.0f} {size / 1e6:>10.2f} {size / args.rows:>10.1f}")
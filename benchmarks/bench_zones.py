@@ -0,0 +1,58 @@
+"""
+Benchmark of zone membership: per object x zone shapely checks vs. the rasterized ZoneEngine.
+
+usage: python -m benchmarks.bench_zones
+"""
+import time
+import numpy as np
+from shapely.geometry import Point, Polygon
+from device.logic.zones import ZoneEngine, foot_points
+
+FRAME_WIDTH, FRAME_HEIGHT = 1280, 720
+NUM_TRACKS, NUM_ZONES = 50, 30
+
+
+def random_zone(rng):
+    center = rng.uniform([100, 100], [FRAME_WIDTH - 100, FRAME_HEIGHT - 100])
+    angles = np.sort(rng.uniform(0, 2 * np.pi, 8))
+    radii = rng.uniform(40, 150, 8)
+    points = center + np.stack([np.cos(angles), np.sin(angles)], axis=1) * radii[:, None]
+    return points.astype(int).tolist()
+
+
+def shapely_membership(bboxes, zones):
+    # Same as the former EventManager._check_zone, for every object and zone
+    inside = []
+    for x1, y1, x2, y2 in bboxes:
+        point = Point((x1 + x2) / 2, y2)
+        inside.append([Polygon(zone["coords"]).contains(point) for zone in zones])
+    return np.array(inside, dtype=bool)
+
+
+def bench(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    zones = [{"zone_id": i + 1, "coords": random_zone(rng)} for i in range(NUM_ZONES)]
+    x1 = rng.uniform(0, FRAME_WIDTH - 80, NUM_TRACKS)
+    y1 = rng.uniform(0, FRAME_HEIGHT - 200, NUM_TRACKS)
+    bboxes = np.stack([x1, y1, x1 + 80, y1 + 200], axis=1).astype(int).tolist()
+
+    engine = ZoneEngine()
+    setup_ms = bench(lambda: engine.set_zones(zones, FRAME_WIDTH, FRAME_HEIGHT), 5)
+    points = foot_points(bboxes)
+
+    shapely_ms = bench(lambda: shapely_membership(bboxes, zones), 20)
+    engine_ms = bench(lambda: engine.membership(points), 1000)
+
+    agreement = (shapely_membership(bboxes, zones) == engine.membership(points)).mean()
+    print(f"{NUM_TRACKS} tracks x {NUM_ZONES} zones at {FRAME_WIDTH}x{FRAME_HEIGHT}")
+    print(f"ZoneEngine.set_zones (once): {setup_ms:.2f} ms")
+    print(f"shapely per frame:           {shapely_ms:.3f} ms")
+    print(f"ZoneEngine per frame:        {engine_ms:.3f} ms ({shapely_ms / engine_ms:.0f}x faster)")
+    print(f"agreement:                   {agreement * 100:.2f}% (differences are boundary pixels)")
@@ -0,0 +1,66 @@
+"""
+Parity check between the ultralytics path and a native backend.
+
+Runs both models on the same images and matches detections by IoU. Fails if a
+detection is missing on either side or the matched boxes/confidences drift too far.
+
+usage: python -m benchmarks.check_backend_parity --pt device/training/models/yolo11_person_only.pt
+           --onnx device/training/models/yolo11_person_only.onnx --images path/to/images [--backend openvino]
+"""
+import argparse
+import os
+import sys
+import cv2
+from device.inference.inference import run_inference_array
+from device.inference.backends import box_iou, load_backend, xywh_to_xyxy
+
+
+def xywh_iou(a, b):
+    return box_iou(xywh_to_xyxy(a), xywh_to_xyxy(b))
+
+
+def compare(reference, candidate, min_iou, max_conf_diff):
+    """ Returns a list of mismatch descriptions, empty if the detections agree. """
+    errors = []
+    if len(reference) != len(candidate):
+        errors.append(f"{len(reference)} reference detections vs {len(candidate)} candidate detections")
+    if len(reference) == 0 or len(candidate) == 0:
+        return errors
+    iou = xywh_iou(reference[:, :4], candidate[:, :4])
+    for i, j in enumerate(iou.argmax(axis=1)):
+        if iou[i, j] < min_iou:
+            errors.append(f"detection {i}: best IoU {iou[i, j]:.3f}")
+        elif reference[i, 5] != candidate[j, 5]:
+            errors.append(f"detection {i}: class {reference[i, 5]:.0f} vs {candidate[j, 5]:.0f}")
+        elif abs(reference[i, 4] - candidate[j, 4]) > max_conf_diff:
+            errors.append(f"detection {i}: conf {reference[i, 4]:.3f} vs {candidate[j, 4]:.3f}")
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pt", type=str, required=True)
+    parser.add_argument("--onnx", type=str, required=True)
+    parser.add_argument("--images", type=str, required=True)
+    parser.add_argument("--backend", type=str, default="onnxruntime", choices=["onnxruntime", "openvino"])
+    parser.add_argument("--min_iou", type=float, default=0.9)
+    parser.add_argument("--max_conf_diff", type=float, default=0.05)
+    args = parser.parse_args()
+
+    reference_model = load_backend("ultralytics", args.pt)
+    candidate_model = load_backend(args.backend, args.onnx)
+
+    failures = 0
+    image_files = sorted(os.listdir(args.images))
+    for image_file in image_files:
+        frame = cv2.imread(os.path.join(args.images, image_file))
+        if frame is None:
+            continue
+        errors = compare(run_inference_array(frame, reference_model), run_inference_array(frame, candidate_model),
+                         args.min_iou, args.max_conf_diff)
+        if errors:
+            failures += 1
+            print(f"{image_file}: " + "; ".join(errors))
+
+    print(f"{len(image_files) - failures}/{len(image_files)} images match")
+    sys.exit(1 if failures else 0)
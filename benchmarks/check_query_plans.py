@@ -0,0 +1,88 @@
+"""
+EXPLAIN QUERY PLAN check for the indexed access paths.
+
+Creates a migrated database in a temporary directory, fills it with some rows and
+fails if a hot query scans a table, sorts in a temp b-tree or misses its index.
+
+usage: python -m benchmarks.check_query_plans
+"""
+import os
+import sys
+import tempfile
+import datetime
+from backend.db.database_manager import DatabaseManager, day_range
+
+# (description, query, parameters, text that must appear in the plan)
+CHECKS = [
+    ("events by location and day range",
+     "SELECT * FROM events WHERE location_id = ? AND time >= ? AND time < ? ORDER BY time",
+     (1,) + day_range("2025-01-01", "2025-01-07"),
+     "USING COVERING INDEX idx_events_location_time"),
+    ("page of a location's events",
+     "SELECT * FROM events WHERE location_id = ? AND event_id > ? ORDER BY event_id LIMIT ?",
+     (1, 100, 500),
+     "USING INDEX idx_events_location"),
+    ("export of a location's events",
+     "SELECT * FROM events WHERE location_id = ? AND time >= ? AND time < ? "
+     "ORDER BY time, object_id, zone_id, has_helmet, has_vest, event_id",
+     (1,) + day_range("2025-01-01", "2025-01-07"),
+     "USING COVERING INDEX idx_events_location_time"),
+    ("object trajectory over a time range",
+     "SELECT t_ms, x, y FROM positions WHERE location_id = ? AND object_id = ? AND t_ms >= ? AND t_ms < ? ORDER BY t_ms",
+     (1, 1, 0, 10 ** 13),
+     "USING PRIMARY KEY"),
+    ("zones of a location",
+     "SELECT * FROM zones WHERE location_id = ?",
+     (1,),
+     "USING INDEX idx_zones_location"),
+]
+
+
+def fill(db_manager):
+    start = datetime.datetime(2025, 1, 1)
+    for i in range(2000):
+        time = (start + datetime.timedelta(minutes=7 * i)).isoformat()
+        db_manager.insert_events(i % 50, i % 5, i % 3, i % 2, 0, time, commit=False)
+    db_manager.insert_object_positions([(i % 3, i % 50, 1000 * i, 1.0, 2.0) for i in range(5000)], commit=False)
+    for location_id in range(3):
+        for zone in range(5):
+            db_manager.cursor.execute("INSERT INTO zones (location_id, coords, name) VALUES (?, '[]', ?)",
+                                      (location_id, f"zone {zone}"))
+    db_manager.commit()
+    db_manager.cursor.execute("ANALYZE")
+
+
+def check_plan(db_manager, query, params, expected):
+    db_manager.cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+    plan = [row[-1] for row in db_manager.cursor.fetchall()]
+    errors = []
+    if not any(expected in step for step in plan):
+        errors.append(f"expected '{expected}'")
+    if any(step.startswith("SCAN") for step in plan):
+        errors.append("full table scan")
+    if any("TEMP B-TREE" in step for step in plan):
+        errors.append("sorts in a temp b-tree")
+    return plan, errors
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(os.path.join(tmp_dir, "plans.db"))
+        fill(db_manager)
+
+        failures = 0
+        for description, query, params, expected in CHECKS:
+            plan, errors = check_plan(db_manager, query, params, expected)
+            status = "ok" if not errors else "FAIL: " + "; ".join(errors)
+            print(f"{description}: {status}")
+            for step in plan:
+                print(f"    {step}")
+            failures += bool(errors)
+
+        rows = db_manager.get_events_by_date(1, "2025-01-02", "2025-01-02")
+        if not rows or any(not row["time"].startswith("2025-01-02") for row in rows):
+            print("get_events_by_date: FAIL: wrong rows for a single day")
+            failures += 1
+        db_manager.sqlconn.close()
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,74 @@
+"""
+Check of the trajectory simplification and resampling used by /trajectories.
+
+Runs fixed cases (a track that doubles back, a standing track, gaps) and random
+tracks, and fails if a point dropped by simplify_rdp is further than the tolerance
+from the simplified polyline or resample bridges a gap longer than max_gap_ms.
+
+usage: python -m benchmarks.check_trajectories [--tracks 200] [--tolerance 2.0]
+"""
+import argparse
+import sys
+import numpy as np
+from backend.api.trajectories import simplify_rdp, resample
+
+
+def segment_distance(points, a, b):
+    direction = b - a
+    length_sq = direction @ direction
+    t = np.zeros(len(points)) if length_sq == 0 else np.clip((points - a) @ direction / length_sq, 0.0, 1.0)
+    offset = points - a - t[:, None] * direction
+    return np.hypot(offset[:, 0], offset[:, 1])
+
+
+def max_deviation(points, simplified):
+    """ Largest distance of an original point to the simplified polyline (points are [t_ms, x, y]). """
+    if len(simplified) == 1:
+        return float(segment_distance(points[:, 1:], simplified[0, 1:], simplified[0, 1:]).max())
+    worst = 0.0
+    # Each original point belongs to the simplified segment spanning its time
+    for a, b in zip(simplified[:-1], simplified[1:]):
+        inside = (points[:, 0] >= a[0]) & (points[:, 0] <= b[0])
+        worst = max(worst, float(segment_distance(points[inside, 1:], a[1:], b[1:]).max()))
+    return worst
+
+
+def fixed_cases():
+    failures = []
+    back = np.array([[0, 0, 0], [1, 10, 0], [2, 5, 0]], dtype=np.float64)
+    if len(simplify_rdp(back, 1.0)) != 3:
+        failures.append("track that doubles back lost its turning point")
+    still = np.array([[0, 3, 3], [1, 3, 9], [2, 3, 3]], dtype=np.float64)
+    if len(simplify_rdp(still, 1.0)) != 3:
+        failures.append("excursion from a standing track was dropped")
+    line = np.array([[i, i, 2 * i] for i in range(10)], dtype=np.float64)
+    if len(simplify_rdp(line, 0.1)) != 2:
+        failures.append("straight track was not reduced to its end points")
+    gap = np.array([[0, 0, 0], [100, 1, 0], [5000, 50, 0], [5100, 51, 0]], dtype=np.float64)
+    resampled = resample(gap, 50, 2000)
+    if ((resampled[:, 0] > 100) & (resampled[:, 0] < 5000)).any():
+        failures.append("resample bridged a gap longer than max_gap_ms")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    args = parser.parse_args()
+
+    failures = fixed_cases()
+    rng = np.random.default_rng(0)
+    for i in range(args.tracks):
+        n = int(rng.integers(2, 300))
+        xy = np.cumsum(rng.normal(0, 3, size=(n, 2)), axis=0)
+        points = np.column_stack([np.arange(n) * 100.0, xy])
+        simplified = simplify_rdp(points, args.tolerance)
+        deviation = max_deviation(points, simplified)
+        if deviation > args.tolerance + 1e-9:
+            failures.append(f"random track {i}: dropped point {deviation:.2f} px from the polyline")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("ok" if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
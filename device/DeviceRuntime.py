@@ -1,20 +1,48 @@
 import cv2
-from ultralytics import YOLO
 import time
-from device.inference.inference import run_inference
+from device.inference.inference import run_inference_array
 from device.inference.tracker import Tracker, DetectionResults
+from device.inference.motion import MotionGate
+from device.inference.backends import load_backend
 from device.logic.events import EventManager
 import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import yaml
-from ultralytics.nn.tasks import DetectionModel
-import torch
 from .utils.logger import get_logger
+from .utils.pipeline import LatestFrameGrabber, DropOldestQueue
+from .utils.timing import StageTimer, PhaseTimer
+from .utils.preview import PreviewPublisher
 from device.training.dataset.dataset_transform import load_class_mapping
 
+# (person detector, PPE detector) per inference backend
+DEFAULT_MODEL_PATHS = {
+    "ultralytics": ("device/training/models/yolo11_person_only.pt", "device/training/models/yolo11_ppe_only_v2.pt"),
+    "onnxruntime": ("device/training/models/yolo11_person_only.onnx", "device/training/models/yolo11_ppe_only_v2.onnx"),
+    "openvino": ("device/training/models/yolo11_person_only.onnx", "device/training/models/yolo11_ppe_only_v2.onnx"),
+}
+
+MODEL_CACHE_DIR = "device/training/models/.cache"
+
 class DeviceRuntime:
-    def __init__(self, db_queue):
+    def __init__(self, db_queue, pipelined=False, headless=False, preview=False, preview_fps=5,
+                 ppe_rechecks_per_frame=2, ppe_budget_ms=20.0, motion_gating=False, motion_force_every=15,
+                 backend="ultralytics", person_model=None, ppe_model=None, fast_startup=False):
         self.db_queue = db_queue
+        self.fast_startup = fast_startup
+        self.model_cache_dir = MODEL_CACHE_DIR if fast_startup else None
+        self.backend = backend
+        default_person_model, default_ppe_model = DEFAULT_MODEL_PATHS[backend]
+        self.person_model_path = person_model or default_person_model
+        self.ppe_model_path = ppe_model or default_ppe_model
+        self.motion_gate = MotionGate(force_every=motion_force_every) if motion_gating else None
+        self.ppe_rechecks_per_frame = ppe_rechecks_per_frame
+        self.ppe_budget_ms = ppe_budget_ms
+        self.pipelined = pipelined
+        self.headless = headless
+        self.preview = PreviewPublisher(max_fps=preview_fps) if preview else None
+        self.grabber = None
+        self.timer = StageTimer()
         self.tracker = None
         self.event_manager = None
         self.model = None
@@ -22,22 +50,82 @@ class DeviceRuntime:
         self.cam = None
         self.running = False
         self.class_names = None
+        self.trackable_class_ids = None
         self.response_queue = queue.Queue()
         self.frame_width = None
         self.frame_height = None
-        self._initialize_components()
         self.frame_count = 0
         self.FRAME_SAMPLE = 3
+        self.CHECK_INTERVAL = 5
+        self.TIMING_LOG_INTERVAL = 10
+        self.PIPELINE_QUEUE_SIZE = 2
+        self.WARMUP_ITERATIONS = 10
         self.warmup_counter = 0
+        self._initialize_components()
 
 
 
     def _initialize_components(self):
-        self._load_model()
-
+        startup = PhaseTimer()
         self.class_names = load_class_mapping("device/training/dataset/yolo11_person_only.yaml")
+        trackable_classes = ["Person", "vehicle"]
+        self.trackable_class_ids = np.array([cls_id for cls_id, name in self.class_names.items() if name in trackable_classes],
+                                            dtype=np.float32)
         ppe_names = load_class_mapping("device/training/dataset/safety-dataset_ppe_only.yaml")
 
+        if self.fast_startup:
+            ppe_detector = self._initialize_parallel(startup)
+        else:
+            with startup.phase("person_model"):
+                self._load_model()
+            with startup.phase("camera"):
+                cam_fps = self._open_camera()
+            with startup.phase("tracker"):
+                self.tracker = Tracker(class_names=self.class_names, cam_fps=cam_fps)
+            with startup.phase("ppe_model"):
+                ppe_detector = load_backend(self.backend, self.ppe_model_path)
+
+        inference_logger = get_logger("Inference")
+        self.event_manager = EventManager(logger=inference_logger, db_queue=self.db_queue, class_names=self.class_names, ppe_names=ppe_names,
+                                          ppe_rechecks_per_frame=self.ppe_rechecks_per_frame, ppe_budget_ms=self.ppe_budget_ms,
+                                          ppe_detector=ppe_detector)
+        self.logger.info(f"Startup timing: {startup.report()}")
+
+    def _initialize_parallel(self, startup):
+        """
+        Loads both detectors and opens the camera (plus the tracker's ReID model) concurrently.
+        Each detector is warmed up on a blank frame as soon as it is loaded, so warm-up
+        overlaps with opening the camera instead of running in the monitoring loop.
+        Returns the PPE detector.
+        """
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            person_future = pool.submit(self._load_and_warmup, startup, "person_model", self.person_model_path)
+            ppe_future = pool.submit(self._load_and_warmup, startup, "ppe_model", self.ppe_model_path)
+            camera_future = pool.submit(self._open_camera_and_tracker, startup)
+            self.model = person_future.result()
+            ppe_detector = ppe_future.result()
+            camera_future.result()
+
+        self.warmup_counter = self.WARMUP_ITERATIONS
+        return ppe_detector
+
+    def _load_and_warmup(self, startup, name, model_path):
+        with startup.phase(name):
+            model = load_backend(self.backend, model_path, cache_dir=self.model_cache_dir)
+        with startup.phase(f"{name}_warmup"):
+            blank = np.zeros((480, 640, 3), dtype=np.uint8)
+            for _ in range(self.WARMUP_ITERATIONS):
+                _ = run_inference_array(blank, model)
+        return model
+
+    def _open_camera_and_tracker(self, startup):
+        with startup.phase("camera"):
+            cam_fps = self._open_camera()
+        with startup.phase("tracker"):
+            self.tracker = Tracker(class_names=self.class_names, cam_fps=cam_fps)
+
+    def _open_camera(self):
+        """ Opens the camera and reads the frame size. Returns the camera FPS. """
         self.cam = cv2.VideoCapture(0)
         if not self.cam.isOpened():
             self.logger.error("Failed to open camera")
@@ -48,67 +136,56 @@ class DeviceRuntime:
         ret, frame = self.cam.read()
         if ret:
             self.frame_height, self.frame_width = frame.shape[:2]
-
-        self.tracker = Tracker(class_names=self.class_names, cam_fps=cam_fps)
-        inference_logger = get_logger("Inference")
-        self.event_manager = EventManager(logger=inference_logger, db_queue=self.db_queue, class_names=self.class_names, ppe_names=ppe_names)
+        return cam_fps
 
     def start(self):
         self.running = True
         self._update_config()
+        if self.pipelined:
+            self._run_pipelined()
+        else:
+            self._run_serial()
+
+    def _run_serial(self):
         prev_time = time.time()
         prev_time_fps = time.time()
-        CHECK_INTERVAL = 5
+        prev_time_timing = time.time()
         while self.running:
             try:
                 # Capture frame
-                ret, frame = self.cam.read()
+                with self.timer.measure("capture"):
+                    ret, frame = self.cam.read()
                 if not ret:
                     self.logger.warning("Failed to capture frame from camera")
                     time.sleep(1)
                     continue
-                self.frame_count += 1
-
-                if self.warmup_counter < 10:
-                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    detections = run_inference(rgb_frame, self.model)
-                    self.event_manager.warmup(frame)
-                    self.warmup_counter += 1
-                    if self.warmup_counter >= 10:
-                        print("Model warmup complete!")
+
+                if self.warmup_counter < self.WARMUP_ITERATIONS:
+                    self._warmup(frame)
                     continue
 
                 # Process frame
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                detections = run_inference(rgb_frame, self.model)
-                # Filter detections by class
-                trackable_classes = ["Person", "vehicle"]
-                detections_for_tracking = [d for d in detections if self.class_names[d[-1]] in trackable_classes]
-                results = DetectionResults(detections_for_tracking)
-
-                # Update tracking and handle events
-                tracked_objects, in_frame_objects = self.tracker.update(results, rgb_frame)
-
-                if self.frame_count % self.FRAME_SAMPLE == 0:
-                    self.event_manager.handle_detections(tracked_objects, rgb_frame, store_obj_pos=True)
-                    self.frame_count = 0
-                else:
-                    self.event_manager.handle_detections(tracked_objects, rgb_frame, store_obj_pos=False)
-
+                rgb_frame, results = self._detect(frame)
+                in_frame_objects = self._track_and_handle(results, rgb_frame)
 
                 # Calculate and display FPS
                 current_time = time.time()
                 fps = 1 / (current_time - prev_time_fps)
                 prev_time_fps = current_time
-                self._visualize(in_frame_objects, frame, fps)
+                with self.timer.measure("visualize"):
+                    self._visualize(in_frame_objects, frame, fps)
 
                 # Periodically check DB for stop flag
                 now = time.time()
-                if now - prev_time > CHECK_INTERVAL:
+                if now - prev_time > self.CHECK_INTERVAL:
                     self._check_status()
                     prev_time = now
 
-                if cv2.waitKey(1) == ord('q'):
+                if now - prev_time_timing > self.TIMING_LOG_INTERVAL:
+                    self._log_timing()
+                    prev_time_timing = now
+
+                if self._quit_requested():
                     self.stop()
                     break
 
@@ -116,18 +193,154 @@ class DeviceRuntime:
                 self.logger.error(f"Error in monitoring loop: {e}")
                 continue
 
+    def _run_pipelined(self):
+        """
+        Runs capture, inference and tracking/events as separate stages.
+        capture -> latest frame slot -> inference -> drop-oldest queue -> tracking/events
+        Tracking/events and visualization stay on the calling thread since cv2.imshow
+        must be called from the thread owning the window.
+        """
+        self.grabber = LatestFrameGrabber(self.cam, timer=self.timer, logger=self.logger)
+        detection_queue = DropOldestQueue(maxsize=self.PIPELINE_QUEUE_SIZE)
+        self.grabber.start()
+
+        inference_thread = threading.Thread(target=self._inference_stage, args=(self.grabber, detection_queue),
+                                            name="InferenceStage", daemon=True)
+        inference_thread.start()
+        try:
+            self._tracking_stage(detection_queue)
+        finally:
+            self.running = False
+            inference_thread.join(timeout=2)
+            if self.grabber is not None:
+                self.grabber.stop()
+                self.grabber = None
+            if detection_queue.dropped:
+                self.logger.info(f"Pipeline dropped {detection_queue.dropped} stale detection results")
+
+    def _inference_stage(self, grabber, detection_queue):
+        last_id = 0
+        while self.running:
+            try:
+                last_id, frame, capture_time = grabber.read(last_id, timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                if self.warmup_counter < self.WARMUP_ITERATIONS:
+                    self._warmup(frame)
+                    continue
+                rgb_frame, results = self._detect(frame)
+                detection_queue.put((frame, rgb_frame, results, capture_time))
+            except Exception as e:
+                self.logger.error(f"Error in inference stage: {e}")
+
+    def _tracking_stage(self, detection_queue):
+        prev_time = time.time()
+        prev_time_fps = time.time()
+        prev_time_timing = time.time()
+        while self.running:
+            try:
+                try:
+                    frame, rgb_frame, results, capture_time = detection_queue.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+
+                in_frame_objects = self._track_and_handle(results, rgb_frame)
+
+                current_time = time.time()
+                fps = 1 / (current_time - prev_time_fps)
+                prev_time_fps = current_time
+                with self.timer.measure("visualize"):
+                    self._visualize(in_frame_objects, frame, fps)
+                self.timer.record("latency", (time.perf_counter() - capture_time) * 1000)
+
+                now = time.time()
+                if now - prev_time > self.CHECK_INTERVAL:
+                    self._check_status()
+                    prev_time = now
+
+                if now - prev_time_timing > self.TIMING_LOG_INTERVAL:
+                    self._log_timing()
+                    prev_time_timing = now
+
+                if self._quit_requested():
+                    self.stop()
+                    break
+
+            except Exception as e:
+                self.logger.error(f"Error in tracking stage: {e}")
+                continue
+
+    def _warmup(self, frame):
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        _ = run_inference_array(rgb_frame, self.model)
+        self.event_manager.warmup(frame)
+        self.warmup_counter += 1
+        if self.warmup_counter >= self.WARMUP_ITERATIONS:
+            print("Model warmup complete!")
+
+    def _detect(self, frame):
+        """
+        Converts the frame and runs the person detector. Returns (rgb_frame, DetectionResults).
+        DetectionResults is None when the motion gate skipped the detector.
+        """
+        with self.timer.measure("inference"):
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if self.motion_gate is not None and not self.motion_gate.check(frame):
+                # Static frame: the tracker advances on prediction alone
+                return rgb_frame, None
+            detections = run_inference_array(rgb_frame, self.model)
+            # Filter detections by class id
+            keep = np.isin(detections[:, 5], self.trackable_class_ids)
+            if not keep.all():
+                detections = detections[keep]
+            results = DetectionResults.from_array(detections)
+        return rgb_frame, results
+
+    def _track_and_handle(self, results, rgb_frame):
+        """ Updates tracking and handles events. Returns the objects currently in frame. """
+        with self.timer.measure("tracking"):
+            if results is None:
+                tracked_objects, in_frame_objects = self.tracker.predict()
+            else:
+                tracked_objects, in_frame_objects = self.tracker.update(results, rgb_frame)
+
+        self.frame_count += 1
+        with self.timer.measure("events"):
+            if self.frame_count % self.FRAME_SAMPLE == 0:
+                self.event_manager.handle_detections(tracked_objects, rgb_frame, store_obj_pos=True)
+                self.frame_count = 0
+            else:
+                self.event_manager.handle_detections(tracked_objects, rgb_frame, store_obj_pos=False)
+        return in_frame_objects
+
+    def _log_timing(self):
+        self.logger.info(f"Stage timings: {self.timer.summary()}")
+        if self.motion_gate is not None:
+            self.logger.info(f"Motion gate skipped {self.motion_gate.skip_ratio() * 100:.0f}% of frames")
+        reid_stats = self.tracker.reid_stats()
+        if reid_stats is not None:
+            self.logger.info(f"ReID cache hit rate {reid_stats['hit_rate'] * 100:.0f}% "
+                             f"({reid_stats['hits']} hits, {reid_stats['misses']} misses), "
+                             f"saved ~{reid_stats['time_saved_ms'] / 1000:.1f}s")
+        self.timer.reset_max()
+
 
     def stop(self):
         # Stop and clean up the device runtime components
         self.running = False
+        if self.grabber is not None:
+            self.grabber.stop()
+            self.grabber = None
         if self.cam:
             self.cam.release()
-        self.db_queue.put({"action": "set_status", "status": False})
-        cv2.destroyAllWindows()
+        self.db_queue.enqueue({"action": "set_status", "status": False})
+        if not self.headless:
+            cv2.destroyAllWindows()
 
 
     def _check_status(self):
-        self.db_queue.put({"action": "get_status", "response": self.response_queue})
+        self.db_queue.enqueue({"action": "get_status", "response": self.response_queue})
         try:
             run_flag = self.response_queue.get_nowait()
             if run_flag is False:
@@ -137,11 +350,9 @@ class DeviceRuntime:
             pass
 
     def _load_model(self):
-        model_config = "device/training/models/yolo11_ppe_cfg.yaml"
-        model_path = "device/training/models/yolo11_person_only.pt"
-
         try:
-            self.model = YOLO(model_path)
+            self.model = load_backend(self.backend, self.person_model_path, cache_dir=self.model_cache_dir)
+            self.logger.info(f"Loaded {self.person_model_path} with {self.backend} backend")
 
 
 
@@ -150,13 +361,25 @@ class DeviceRuntime:
             raise
 
     def _visualize(self, tracked_objects, frame, fps):
+        # Headless: only draw when a preview client wants a frame
+        publish = self.preview is not None and self.preview.wants_frame()
+        if self.headless and not publish:
+            return
+
+        self._draw(tracked_objects, frame, fps)
+        if publish:
+            self.preview.publish(frame)
+        if not self.headless:
+            cv2.imshow("Camera feed", frame)
+
+    def _draw(self, tracked_objects, frame, fps):
+        """ tracked_objects: in-frame view of the tracker's TrackTable. """
         ## -- Visualization --
-        if tracked_objects:
-            for obj in tracked_objects:
-                    bbox = obj["bbox"]
+        if len(tracked_objects):
+            for track_id, bbox, cls_id in zip(tracked_objects["track_id"].tolist(), tracked_objects["bbox"].tolist(),
+                                              tracked_objects["cls"].tolist()):
                     x1, y1, x2, y2 = bbox
-                    cls_name = obj["class"]
-                    track_id = obj["track_id"]
+                    cls_name = self.class_names[cls_id]
                     cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
                     cv2.putText(frame, f"Track ID: {track_id} {cls_name}", (x1, y1-10),
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
@@ -168,13 +391,17 @@ class DeviceRuntime:
 
         cv2.putText(frame, f"FPS: {fps:.0f}", (10, 30),
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        cv2.imshow("Camera feed", frame)
+
+    def _quit_requested(self):
+        if self.headless:
+            return False
+        return cv2.waitKey(1) == ord('q')
 
 
 
     def _update_config(self):
         response_queue = queue.Queue()
-        self.db_queue.put({"action": "get_location_id", "response": response_queue})
+        self.db_queue.enqueue({"action": "get_location_id", "response": response_queue})
         try:
             location_id = response_queue.get(timeout=0.1)
             self.event_manager.set_location(location_id)
@@ -182,7 +409,7 @@ class DeviceRuntime:
             print("No location ID fetched.")
 
         response_queue = queue.Queue()
-        self.db_queue.put({"action": "get_zones", "response": response_queue})
+        self.db_queue.enqueue({"action": "get_zones", "response": response_queue})
         try:
             zones = response_queue.get(timeout=0.1)
             print(f"Fetched {len(zones)} zones from database.")
@@ -192,7 +419,7 @@ class DeviceRuntime:
             print("No zones fetched.")
 
         response_queue = queue.Queue()
-        self.db_queue.put({"action": "get_latest_object_id", "response": response_queue})
+        self.db_queue.enqueue({"action": "get_latest_object_id", "response": response_queue})
         try:
             last_object_id = response_queue.get(timeout=0.1)
             self.tracker.set_track_id(last_object_id)
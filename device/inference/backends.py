@@ -0,0 +1,219 @@
+import os
+import numpy as np
+from device.training.data.transforms import letterbox
+from device.utils.logger import get_logger
+
+logger = get_logger("Inference")
+
+
+class InferenceBackend:
+    """
+    Base class for native detection backends.
+    Does its own letterboxing and NMS around a raw YOLO head output of shape
+    (batch, 4 + num_classes, num_anchors), as exported by convert_model.py.
+    Subclasses only implement _forward.
+    """
+    def __init__(self, model_path, imgsz=640, conf=0.5, iou=0.5, max_det=300):
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+        self.input_dtype = np.float32
+        self.dynamic_batch = False
+
+    def _forward(self, blob):
+        raise NotImplementedError
+
+    def detect(self, frame):
+        """ Returns an (N, 6) float32 array of [x, y, w, h, conf, cls] in frame coordinates. """
+        blob, transform = self._preprocess(frame)
+        output = self._forward(blob[None])
+        return self._postprocess(output[0], transform, frame.shape)
+
+    def detect_batch(self, frames):
+        """ Returns one detection array per frame. Uses a single forward pass if the model has a dynamic batch axis. """
+        if not frames:
+            return []
+        if not self.dynamic_batch:
+            return [self.detect(frame) for frame in frames]
+        prepared = [self._preprocess(frame) for frame in frames]
+        output = self._forward(np.stack([blob for blob, _ in prepared]))
+        return [self._postprocess(out, transform, frame.shape)
+                for out, (_, transform), frame in zip(output, prepared, frames)]
+
+    def _preprocess(self, frame):
+        # Same channel order as ultralytics' predictor, which flips BGR to RGB
+        img = np.ascontiguousarray(frame[..., ::-1])
+        img, _, (ratio, dw, dh) = letterbox(img, new_shape=(self.imgsz, self.imgsz))
+        blob = img.transpose(2, 0, 1).astype(self.input_dtype) / 255.0
+        return blob, (ratio, int(np.floor(dw)), int(np.floor(dh)))
+
+    def _postprocess(self, output, transform, frame_shape):
+        ratio, pad_x, pad_y = transform
+        pred = output.T.astype(np.float32, copy=False)  # (num_anchors, 4 + num_classes)
+        scores = pred[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = conf >= self.conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        pred, cls, conf = pred[keep], cls[keep], conf[keep]
+
+        boxes = xywh_to_xyxy(pred[:, :4])
+        keep = nms(boxes, conf, self.iou, classes=cls)[:self.max_det]
+        boxes, conf, cls = boxes[keep], conf[keep], cls[keep]
+
+        # Undo letterbox and clip to the frame
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / ratio).clip(0, frame_shape[1])
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / ratio).clip(0, frame_shape[0])
+
+        dets = np.empty((len(boxes), 6), dtype=np.float32)
+        dets[:, 0] = (boxes[:, 0] + boxes[:, 2]) / 2
+        dets[:, 1] = (boxes[:, 1] + boxes[:, 3]) / 2
+        dets[:, 2] = boxes[:, 2] - boxes[:, 0]
+        dets[:, 3] = boxes[:, 3] - boxes[:, 1]
+        dets[:, 4] = conf
+        dets[:, 5] = cls
+        return dets
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    def __init__(self, model_path, num_threads=0, cache_dir=None, **kwargs):
+        import onnxruntime as ort
+        super().__init__(model_path, **kwargs)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        load_path = model_path
+        if cache_dir is not None:
+            # Reuse the graph optimized on a previous run, or save it for the next one
+            cache_path = _cache_path(cache_dir, model_path, ".optimized.onnx")
+            if _cache_valid(cache_path, model_path):
+                load_path = cache_path
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            else:
+                options.optimized_model_filepath = cache_path
+        self.session = ort.InferenceSession(load_path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        if isinstance(model_input.shape[2], int):
+            self.imgsz = model_input.shape[2]
+        if model_input.type == "tensor(float16)":
+            self.input_dtype = np.float16
+
+    def _forward(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVINOBackend(InferenceBackend):
+    def __init__(self, model_path, cache_dir=None, **kwargs):
+        import openvino as ov
+        super().__init__(model_path, **kwargs)
+        core = ov.Core()
+        if cache_dir is not None:
+            # OpenVINO caches the compiled blob itself
+            os.makedirs(cache_dir, exist_ok=True)
+            core.set_property({"CACHE_DIR": cache_dir})
+        model = core.read_model(model_path)
+        model_input = model.input(0)
+        self.dynamic_batch = model_input.get_partial_shape()[0].is_dynamic
+        if model_input.get_partial_shape()[2].is_static:
+            self.imgsz = model_input.get_partial_shape()[2].get_length()
+        self.compiled = core.compile_model(model, "CPU")
+        self.output = self.compiled.output(0)
+
+    def _forward(self, blob):
+        return self.compiled(blob)[self.output]
+
+
+def load_backend(backend, model_path, cache_dir=None, **kwargs):
+    """
+    Loads a detection model for the given backend.
+    "ultralytics" returns a YOLO model; "onnxruntime" and "openvino" return an InferenceBackend.
+    With cache_dir, optimized model artifacts (fused weights, optimized graph, compiled
+    blob) are stored there and reused while they are newer than model_path.
+    """
+    if backend == "ultralytics":
+        return _load_yolo(model_path, cache_dir)
+    if backend == "onnxruntime":
+        return OnnxRuntimeBackend(model_path, cache_dir=cache_dir, **kwargs)
+    if backend == "openvino":
+        return OpenVINOBackend(model_path, cache_dir=cache_dir, **kwargs)
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def _load_yolo(model_path, cache_dir):
+    from ultralytics import YOLO
+    if cache_dir is None:
+        return YOLO(model_path)
+
+    cache_path = _cache_path(cache_dir, model_path, ".fused.pt")
+    if _cache_valid(cache_path, model_path):
+        return YOLO(cache_path)
+
+    model = YOLO(model_path)
+    try:
+        model.fuse()
+        model.save(cache_path)
+    except Exception as e:
+        logger.warning(f"Could not cache fused model for {model_path}: {e}")
+    return model
+
+
+def _cache_path(cache_dir, model_path, suffix):
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(cache_dir, stem + suffix)
+
+
+def _cache_valid(cache_path, model_path):
+    return os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(model_path)
+
+
+def xywh_to_xyxy(xywh):
+    xyxy = np.empty_like(xywh)
+    xyxy[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    xyxy[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+    return xyxy
+
+
+def box_iou(a, b):
+    """ IoU matrix between (N, 4) and (M, 4) xyxy boxes. """
+    inter_w = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def nms(boxes, scores, iou_threshold, classes=None):
+    """
+    Greedy non-maximum suppression, vectorized over the remaining boxes.
+    When classes is given, boxes of different classes never suppress each other.
+    Returns indices of kept boxes sorted by descending score.
+    """
+    if classes is not None and len(boxes):
+        # Offset boxes per class by more than their spread so they cannot overlap across classes,
+        # also when coordinates are negative (boxes partly outside the frame)
+        boxes = boxes + (classes[:, None] * (boxes.max() - boxes.min() + 1))
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.maximum(0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        inter_h = np.maximum(0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
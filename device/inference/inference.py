@@ -1,11 +1,20 @@
+import numpy as np
 from device.utils.logger import get_logger
+from device.inference.backends import InferenceBackend
 # Initialize logger for inference module
 logger = get_logger("Inference")
 
 
 
+def _to_detection_list(dets):
+    return [([int(x), int(y), int(w), int(h)], conf, int(cls_id)) for x, y, w, h, conf, cls_id in dets.tolist()]
+
+
 def run_inference(frame, model):
     try:
+        if isinstance(model, InferenceBackend):
+            return _to_detection_list(model.detect(frame))
+
         results = model.predict(frame, verbose=False, conf=0.5, iou=0.5)
         res = results[0]
 
@@ -24,3 +33,53 @@ def run_inference(frame, model):
     except Exception as e:
         logger.error(f"Error in run_inference: {e}")
         return []
+
+
+def run_inference_array(frame, model):
+    """
+    Array-native variant of run_inference.
+    Returns an (N, 6) float32 array of [x, y, w, h, conf, cls], built on the model's
+    device and copied to host memory once per frame.
+    """
+    try:
+        if isinstance(model, InferenceBackend):
+            return model.detect(frame)
+
+        # Only the ultralytics path needs torch; the native backends run without it
+        import torch
+        results = model.predict(frame, verbose=False, conf=0.5, iou=0.5)
+        boxes = results[0].boxes
+        dets = torch.cat((boxes.xywh, boxes.conf[:, None], boxes.cls[:, None]), dim=1)
+        return dets.cpu().numpy().astype(np.float32, copy=False)
+    except Exception as e:
+        logger.error(f"Error in run_inference_array: {e}")
+        return np.zeros((0, 6), dtype=np.float32)
+
+
+def run_batch_inference(frames, model):
+    """
+    Runs the model once on a list of frames.
+    Returns one detection list per frame, in the same format as run_inference.
+    """
+    if not frames:
+        return []
+    try:
+        if isinstance(model, InferenceBackend):
+            return [_to_detection_list(dets) for dets in model.detect_batch(frames)]
+
+        results = model.predict(frames, verbose=False, conf=0.5, iou=0.5)
+
+        batch_detections = []
+        for res in results:
+            xywh = res.boxes.xywh.cpu().numpy()
+            confs = res.boxes.conf.cpu().numpy()
+            cls = res.boxes.cls.cpu().numpy()
+            batch_detections.append([
+                ([int(x), int(y), int(w), int(h)], float(conf), int(cls_id))
+                for (x, y, w, h), conf, cls_id in zip(xywh, confs, cls)
+            ])
+
+        return batch_detections
+    except Exception as e:
+        logger.error(f"Error in run_batch_inference: {e}")
+        return [[] for _ in frames]
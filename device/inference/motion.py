@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap motion detector used to skip the person detector on static frames.
+    Frames are downscaled to a small grayscale image and compared against the frame
+    of the last full inference. Inference runs when the fraction of changed pixels
+    exceeds threshold, or at least every force_every frames.
+    """
+    def __init__(self, threshold=0.005, pixel_delta=25, width=160, force_every=15):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.force_every = force_every
+        self.reference = None
+        self.frames_since_inference = 0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+
+    def check(self, frame):
+        """ Returns True if the detector should run on this frame. """
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        self.frames_checked += 1
+
+        if self.reference is None or self.reference.shape != gray.shape:
+            self._mark_inference(gray)
+            return True
+
+        self.frames_since_inference += 1
+        diff = cv2.absdiff(gray, self.reference)
+        changed = np.count_nonzero(diff > self.pixel_delta) / diff.size
+        if changed >= self.threshold or self.frames_since_inference >= self.force_every:
+            self._mark_inference(gray)
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    def _mark_inference(self, gray):
+        self.reference = gray
+        self.frames_since_inference = 0
+
+    def skip_ratio(self):
+        if self.frames_checked == 0:
+            return 0.0
+        return self.frames_skipped / self.frames_checked
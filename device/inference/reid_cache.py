@@ -0,0 +1,109 @@
+import time
+import numpy as np
+from device.inference.backends import box_iou, xywh_to_xyxy
+
+
+class ReIDCache:
+    """
+    Per-track cache of ReID embeddings in front of BOTSORT's encoder.
+
+    Before each tracker update, prefetch() assigns every detection an embedding:
+    a detection reuses the embedding of the track it overlaps with (IoU above
+    iou_threshold, i.e. the box has not changed much) if that embedding is younger
+    than refresh_every frames. All other detections are encoded together in one
+    batch. BOTSORT then calls the cache as its encoder and gets the prefetched
+    embeddings. commit() attributes fresh embeddings to tracks after the update.
+    """
+    def __init__(self, encoder, iou_threshold=0.7, refresh_every=10):
+        self.encoder = encoder
+        self.iou_threshold = iou_threshold
+        self.refresh_every = refresh_every
+        self.frame_id = 0
+        self.entries = {}      # track_id -> (xyxy when computed, embedding, frame computed)
+        self.fresh = {}        # id(embedding) -> (xyxy, embedding) computed on this frame
+        self.frame_feats = {}  # detection box bytes -> embedding, for the current frame
+        self.hits = 0
+        self.misses = 0
+        self.cost_per_crop_ms = None
+        self.time_saved_ms = 0.0
+
+    def prefetch(self, img, xywh):
+        self.frame_id += 1
+        self.frame_feats = {}
+        self.fresh = {}
+        if len(xywh) == 0:
+            return
+        xywh = np.ascontiguousarray(xywh[:, :4], dtype=np.float32)
+        boxes = xywh_to_xyxy(xywh)
+        feats = [None] * len(xywh)
+
+        track_ids = [track_id for track_id, (_, _, computed) in self.entries.items()
+                     if self.frame_id - computed < self.refresh_every]
+        if track_ids:
+            iou = box_iou(boxes, np.array([self.entries[track_id][0] for track_id in track_ids]))
+            # Best matches first; every cached embedding is reused at most once per frame
+            for i in np.argsort(-iou.max(axis=1)):
+                j = iou[i].argmax()
+                if iou[i, j] < self.iou_threshold:
+                    continue
+                feats[i] = self.entries[track_ids[j]][1]
+                iou[:, j] = 0
+
+        missing = [i for i, feat in enumerate(feats) if feat is None]
+        if missing:
+            start = time.perf_counter()
+            dets = np.concatenate([xywh[missing], np.arange(len(missing), dtype=np.float32)[:, None]], axis=1)
+            computed = self.encoder(img, dets)
+            self._record_cost(len(missing), (time.perf_counter() - start) * 1000)
+            for i, feat in zip(missing, computed):
+                feats[i] = feat
+                self.fresh[id(feat)] = (boxes[i], feat)
+
+        hits = len(xywh) - len(missing)
+        self.hits += hits
+        self.misses += len(missing)
+        if self.cost_per_crop_ms is not None:
+            self.time_saved_ms += hits * self.cost_per_crop_ms
+        for box, feat in zip(xywh, feats):
+            self.frame_feats[box.tobytes()] = feat
+
+    def __call__(self, img, dets):
+        """ Encoder interface used by BOTSORT: dets is (N, 5) [x, y, w, h, idx]. """
+        xywh = np.ascontiguousarray(dets[:, :4], dtype=np.float32)
+        feats = [self.frame_feats.get(box.tobytes()) for box in xywh]
+        missing = [i for i, feat in enumerate(feats) if feat is None]
+        if missing:
+            # Not prefetched (should not happen), encode directly
+            computed = self.encoder(img, dets[missing])
+            self.misses += len(missing)
+            for i, feat in zip(missing, computed):
+                feats[i] = feat
+        return feats
+
+    def commit(self, tracks):
+        """ Stores embeddings computed on this frame under the track that received them. """
+        for track in tracks:
+            fresh = self.fresh.get(id(track.curr_feat))
+            if fresh is not None and fresh[1] is track.curr_feat:
+                self.entries[track.track_id] = (fresh[0], fresh[1], self.frame_id)
+        alive = {track.track_id for track in tracks}
+        self.entries = {track_id: entry for track_id, entry in self.entries.items() if track_id in alive}
+        self.fresh = {}
+        self.frame_feats = {}
+
+    def _record_cost(self, num_crops, elapsed_ms, alpha=0.2):
+        cost = elapsed_ms / num_crops
+        if self.cost_per_crop_ms is None:
+            self.cost_per_crop_ms = cost
+        else:
+            self.cost_per_crop_ms += alpha * (cost - self.cost_per_crop_ms)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "time_saved_ms": self.time_saved_ms,
+            "cost_per_crop_ms": self.cost_per_crop_ms or 0.0,
+        }
@@ -2,6 +2,7 @@ from types import SimpleNamespace
 from ultralytics.trackers.bot_sort import BOTSORT
 import numpy as np
 from ultralytics.trackers.basetrack import BaseTrack
+from device.inference.reid_cache import ReIDCache
 class DetectionResults:
     def __init__(self, dets):
         flat_dets = []
@@ -20,8 +21,82 @@ class DetectionResults:
             self.conf = dets_array[:, 4]
             self.cls = dets_array[:, 5].astype(int)
 
+    @classmethod
+    def from_array(cls, dets):
+        """
+        Wraps an (N, 6) [x, y, w, h, conf, cls] array as returned by run_inference_array.
+        The columns are views into dets, nothing is copied.
+        """
+        results = cls.__new__(cls)
+        results.xywh = dets[:, :4]
+        results.conf = dets[:, 4]
+        results.cls = dets[:, 5]
+        return results
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, idx):
+        # BOTSORT indexes the results with boolean masks to split high/low score detections
+        results = self.__class__.__new__(self.__class__)
+        results.xywh = self.xywh[idx]
+        results.conf = self.conf[idx]
+        results.cls = self.cls[idx]
+        return results
+
+TRACK_DTYPE = np.dtype([
+    ("track_id", np.int64),
+    ("bbox", np.int32, (4,)),  # x1, y1, x2, y2
+    ("cls", np.int16),
+    ("score", np.float32),
+    ("age", np.int32),         # frames since the track started
+    ("state", np.uint8),       # TrackState
+    ("in_frame", np.bool_),
+])
+
+class TrackTable:
+    """
+    Fixed-column table of the tracks that are old enough to report.
+    Rows are rewritten in place every frame: in-frame tracks first, then lost tracks,
+    so both groups are contiguous and can be handed out as views without copying.
+    """
+    __slots__ = ("data", "size", "num_in_frame")
+
+    def __init__(self, capacity=64):
+        self.data = np.zeros(capacity, dtype=TRACK_DTYPE)
+        self.size = 0
+        self.num_in_frame = 0
+
+    def fill(self, tracked_stracks, lost_stracks, frame_id, min_age):
+        tracked = [t for t in tracked_stracks if t.is_activated and frame_id - t.start_frame >= min_age]
+        lost = [t for t in lost_stracks if t.is_activated and frame_id - t.start_frame >= min_age]
+        tracks = tracked + lost
+        if len(tracks) > len(self.data):
+            self.data = np.zeros(max(len(tracks), 2 * len(self.data)), dtype=TRACK_DTYPE)
+
+        self.size = len(tracks)
+        self.num_in_frame = len(tracked)
+        if not tracks:
+            return
+        rows = self.data[:self.size]
+        rows["track_id"] = [t.track_id for t in tracks]
+        rows["bbox"] = [t.xyxy for t in tracks]
+        rows["cls"] = [t.cls for t in tracks]
+        rows["score"] = [t.score for t in tracks]
+        rows["age"] = [frame_id - t.start_frame for t in tracks]
+        rows["state"] = [t.state for t in tracks]
+        rows["in_frame"][:self.num_in_frame] = True
+        rows["in_frame"][self.num_in_frame:] = False
+
+    def alive(self):
+        return self.data[:self.size]
+
+    def in_frame(self):
+        return self.data[:self.num_in_frame]
+
 class Tracker:
-    def __init__(self, class_names, cam_fps, with_reid=True, reid_model="yolo11n-cls.pt"):
+    def __init__(self, class_names, cam_fps, with_reid=True, reid_model="yolo11n-cls.pt",
+                 reid_iou_threshold=0.7, reid_refresh_every=10):
         args = SimpleNamespace(
             track_buffer=360,
             track_high_thresh=0.3,
@@ -38,57 +113,47 @@ class Tracker:
 
         self.tracker = BOTSORT(args, frame_rate=int(cam_fps))
         self.class_names = class_names
+        self.reid_cache = None
+        if with_reid and getattr(self.tracker, "encoder", None) is not None:
+            self.reid_cache = ReIDCache(self.tracker.encoder, iou_threshold=reid_iou_threshold, refresh_every=reid_refresh_every)
+            self.tracker.encoder = self.reid_cache
+        self.table = TrackTable()
+        self.FRAME_AGE_THRESHOLD = 5
 
     def update(self, detections, frame):
-        height, width, _ = frame.shape
+        if self.reid_cache is not None:
+            # Encode every detection BOTSORT may use in one batch, reusing cached embeddings
+            self.reid_cache.prefetch(frame, detections.xywh[detections.conf > self.tracker.args.track_low_thresh])
         _ = self.tracker.update(detections, frame)
-        current_frame_id = self.tracker.frame_id
-
-        tracked_objects = []
-
-        alive_tracks = self.tracker.tracked_stracks + self.tracker.lost_stracks
-
-        frame_age_threshold = 5
-
-        for track in alive_tracks:
-            track_age = current_frame_id - track.start_frame
-
-            if not track.is_activated or track_age < frame_age_threshold:
-                continue
-
-            x1, y1, x2, y2 = track.xyxy
-
-            class_name = self.class_names[int(track.cls)]
-
-            tracked_objects.append({
-                "track_id": int(track.track_id),
-                "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                "class": class_name,
-                "conf": float(track.score)
-            })
-
-        in_frame_tracks = []
-
-        for track in self.tracker.tracked_stracks:
-            track_age = current_frame_id - track.start_frame
-
-            if not track.is_activated or track_age < frame_age_threshold:
-                continue
-
-            x1, y1, x2, y2 = track.xyxy
-
-            class_name = self.class_names[int(track.cls)]
-
-            in_frame_tracks.append({
-                "track_id": int(track.track_id),
-                "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                "class": class_name,
-                "conf": float(track.score)
-            })
-
-
-
-        return tracked_objects, in_frame_tracks
+        if self.reid_cache is not None:
+            self.reid_cache.commit(self.tracker.tracked_stracks + self.tracker.lost_stracks)
+        return self._collect()
+
+    def reid_stats(self):
+        """ ReID cache hit rate and estimated time saved, None if ReID is disabled. """
+        if self.reid_cache is None:
+            return None
+        return self.reid_cache.stats()
+
+    def predict(self):
+        """
+        Advances all tracks on Kalman prediction alone.
+        Used for frames where the detector was skipped: tracks keep their state
+        instead of being marked lost for lack of detections.
+        """
+        self.tracker.frame_id += 1
+        self.tracker.multi_predict(self.tracker.tracked_stracks + self.tracker.lost_stracks)
+        return self._collect()
+
+    def _collect(self):
+        """
+        Refreshes the track table in place.
+        Returns (alive, in_frame) views of it: alive covers tracked and lost tracks,
+        in_frame only tracks matched on the current frame.
+        """
+        self.table.fill(self.tracker.tracked_stracks, self.tracker.lost_stracks,
+                        self.tracker.frame_id, self.FRAME_AGE_THRESHOLD)
+        return self.table.alive(), self.table.in_frame()
 
     def set_track_id(self,track_id):
         BaseTrack._count = track_id
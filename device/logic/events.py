@@ -1,16 +1,19 @@
 import os
 from backend.db.database_manager import DatabaseManager
 import datetime
-from ultralytics import YOLO
-from shapely.geometry import Point, Polygon
+import time
+import numpy as np
 from ..utils.logger import get_logger
-from device.inference.inference import run_inference
+from device.inference.inference import run_inference, run_batch_inference
+from .ppe_scheduler import PPEScheduler
+from .zones import ZoneEngine, foot_points
 
 class EventManager:
-    def __init__(self, logger, db_queue, class_names, ppe_names):
+    def __init__(self, logger, db_queue, class_names, ppe_names, ppe_crop_batch=True,
+                 ppe_rechecks_per_frame=2, ppe_budget_ms=20.0, ppe_detector=None):
         self.active_tracks = set()
         self.tracked_objects_info = {}
-        self.in_zone_objects = set()
+        self.zone_engine = ZoneEngine()
         self.zones = None  # Predefined zones can be added here
         self.location = None
         # db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "backend", "db", "events.db")
@@ -19,68 +22,70 @@ class EventManager:
         self.logger = logger
         self.detection_logger = get_logger("DETECTION")
         self.class_names = class_names
+        self.person_cls_ids = np.array([cls_id for cls_id, name in class_names.items() if name == "Person"], dtype=np.int16)
         self.object_positions = []
         self.ppe_names = ppe_names
-        self.ppe_detector = YOLO('device/training/models/yolo11_ppe_only_v2.pt')
-
-    def handle_detections(self, tracked_objects, frame, store_obj_pos=False):
+        if ppe_detector is None:
+            # Imported here so the onnxruntime/openvino backends do not load ultralytics for the PPE model
+            from ultralytics import YOLO
+            ppe_detector = YOLO('device/training/models/yolo11_ppe_only_v2.pt')
+        self.ppe_detector = ppe_detector
+        self.ppe_crop_batch = ppe_crop_batch
+        self.PPE_CROP_PADDING = 0.15
+        self.ppe_scheduler = PPEScheduler(max_checks_per_frame=ppe_rechecks_per_frame, budget_ms=ppe_budget_ms)
+        self.frame_id = 0
+
+    def handle_detections(self, tracks, frame, store_obj_pos=False):
         """
         Handles detections.
         Creates or updates events in DB as needed.
         Check for new objects
-        tracked_objects: [{track_id: 1, bbox: [x1, y1, x2, y2], cls: "Person", conf: 0.9}]
+        tracks: structured array view of the tracker's TrackTable
+                (track_id, bbox [x1, y1, x2, y2], cls, score, age, state, in_frame)
         ppe_detections: [(([x1, y1, x2, y2]), conf, class_id)]
         """
-        if tracked_objects is None:
+        if tracks is None:
             return
-        for obj in tracked_objects:
-            track_id = obj["track_id"]
-
-            if track_id not in self.active_tracks:
-                # New object detected
-                self.active_tracks.add(track_id)
-                ppe_detections = run_inference(frame, self.ppe_detector)
-                if obj["class"] == "Person":
-                    obj["ppe"] = []
-                    for ppe in ppe_detections:
-                        if self._is_ppe_on_person(obj["bbox"], ppe[0]):
-                            obj["ppe"].append(self.ppe_names[ppe[2]])
-                        #if self._is_overlapping(obj["bbox"], ppe[0]):
-                        #    obj["ppe"].append(self.class_names[ppe[2]])
-                    self.tracked_objects_info[track_id] = obj["ppe"]
-
-                self._create_object(obj)
-                self._create_event(obj)
-
-
-
-            if self.zones and obj["class"] == "Person":
-                if track_id in self.tracked_objects_info:
-                    obj["ppe"] = self.tracked_objects_info[track_id]
-                for zone in self.zones:
-                    in_zone = self._check_zone(obj["bbox"], zone["coords"])
-                    # If an object has entered the zone - Create an event in the database
-                    if in_zone and obj["track_id"] not in self.in_zone_objects:
-                        self._create_event(obj, zone["zone_id"])
-                        self.in_zone_objects.add(obj["track_id"])
-                        break
-                    # If an object leaves the zone - Remove track_id from in_zone_objects
-                    elif not in_zone and obj["track_id"] in self.in_zone_objects:
-                        self.in_zone_objects.remove(obj["track_id"])
-                        break
-
-            if store_obj_pos:
-                timestamp = datetime.datetime.now().isoformat()
-                if obj["class"] == "Person":
-                    x = (obj["bbox"][0] + obj["bbox"][2]) / 2 # x_center: (x1+x2)/2
-                    y = obj["bbox"][3] # bottom (y2)
-                    self.object_positions.append({
-                        "object_id": obj["track_id"],
-                        "location": "loc",
-                        "x": x,
-                        "y": y,
-                        "time": timestamp,
-                    })
+        self.frame_id += 1
+        track_ids = tracks["track_id"]
+        is_person = np.isin(tracks["cls"], self.person_cls_ids)
+        is_new = ~np.isin(track_ids, np.fromiter(self.active_tracks, dtype=np.int64, count=len(self.active_tracks)))
+        new_person_rows = np.flatnonzero(is_new & is_person)
+
+        # Re-check PPE of known persons still in frame, within the scheduler's budget
+        visible_ids = track_ids[is_person & ~is_new & tracks["in_frame"]].tolist()
+        recheck_ids = self.ppe_scheduler.select(visible_ids, self.frame_id, reserved=len(new_person_rows))
+        check_rows = np.concatenate([new_person_rows, np.flatnonzero(np.isin(track_ids, recheck_ids))])
+
+        if len(check_rows):
+            start = time.perf_counter()
+            ppe_results = self._check_ppe(tracks[check_rows], frame)
+            self.ppe_scheduler.record_cost(len(check_rows), (time.perf_counter() - start) * 1000)
+            for track_id, ppe in ppe_results.items():
+                self.ppe_scheduler.vote(track_id, ppe, self.frame_id)
+                self.tracked_objects_info[track_id] = self.ppe_scheduler.status(track_id)
+
+        # New objects detected
+        for row in np.flatnonzero(is_new):
+            obj = self._as_object(tracks[row])
+            self._create_object(obj)
+            self._create_event(obj)
+
+        if self.zones:
+            self._handle_zones(tracks[is_person])
+
+        if store_obj_pos:
+            t_ms = int(time.time() * 1000)  # epoch milliseconds
+            location_id = self.location if self.location is not None else 0
+            points = foot_points(tracks["bbox"][is_person])  # x_center: (x1+x2)/2, bottom: y2
+            for track_id, (x, y) in zip(track_ids[is_person].tolist(), points.tolist()):
+                self.object_positions.append({
+                    "object_id": track_id,
+                    "location": location_id,
+                    "x": x,
+                    "y": y,
+                    "t_ms": t_ms,
+                })
 
         # Flush buffer and store in db
         if store_obj_pos:
@@ -89,13 +94,69 @@ class EventManager:
                 self.object_positions.clear()
 
 
-        self.active_tracks = {obj["track_id"] for obj in tracked_objects}
-        self.in_zone_objects = {
-            idx for idx in self.in_zone_objects if idx in self.active_tracks
-        }
+        self.active_tracks = set(track_ids.tolist())
         self.tracked_objects_info = {
             track_id: ppe for track_id, ppe in self.tracked_objects_info.items() if track_id in self.active_tracks
         }
+        self.ppe_scheduler.prune(self.active_tracks)
+
+    def _as_object(self, track):
+        """ Converts one track table row to the dict used for DB messages. """
+        track_id = int(track["track_id"])
+        obj = {
+            "track_id": track_id,
+            "bbox": track["bbox"].tolist(),
+            "class": self.class_names[int(track["cls"])],
+            "conf": float(track["score"]),
+        }
+        if track_id in self.tracked_objects_info:
+            obj["ppe"] = self.tracked_objects_info[track_id]
+        return obj
+
+    def _check_ppe(self, persons, frame):
+        """
+        Runs the PPE detector for all persons (track table rows).
+        Returns {track_id: [ppe names]}.
+        In crop-batch mode every person is cropped with padding and all crops go
+        through the PPE detector as one batch; otherwise the full frame is used once.
+        """
+        if len(persons) == 0:
+            return {}
+        track_ids = persons["track_id"].tolist()
+        bboxes = persons["bbox"].tolist()
+
+        if not self.ppe_crop_batch:
+            ppe_detections = run_inference(frame, self.ppe_detector)
+            return {track_id: self._match_ppe(bbox, ppe_detections) for track_id, bbox in zip(track_ids, bboxes)}
+
+        frame_height, frame_width = frame.shape[:2]
+        crops = []
+        crop_persons = []
+        offsets = []
+        ppe_results = {}
+        for track_id, bbox in zip(track_ids, bboxes):
+            x1, y1, x2, y2 = bbox
+            pad_x = int((x2 - x1) * self.PPE_CROP_PADDING)
+            pad_y = int((y2 - y1) * self.PPE_CROP_PADDING)
+            cx1, cy1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+            cx2, cy2 = min(frame_width, x2 + pad_x), min(frame_height, y2 + pad_y)
+            if cx2 <= cx1 or cy2 <= cy1:
+                # Person box is outside the frame, nothing to check
+                ppe_results[track_id] = []
+                continue
+            crops.append(frame[cy1:cy2, cx1:cx2])
+            crop_persons.append((track_id, bbox))
+            offsets.append((cx1, cy1))
+
+        batch_detections = run_batch_inference(crops, self.ppe_detector)
+        for (track_id, bbox), (off_x, off_y), detections in zip(crop_persons, offsets, batch_detections):
+            # Map crop coordinates back to frame coordinates
+            frame_detections = [([x + off_x, y + off_y, w, h], conf, cls_id) for (x, y, w, h), conf, cls_id in detections]
+            ppe_results[track_id] = self._match_ppe(bbox, frame_detections)
+        return ppe_results
+
+    def _match_ppe(self, person_bbox, ppe_detections):
+        return [self.ppe_names[ppe[2]] for ppe in ppe_detections if self._is_ppe_on_person(person_bbox, ppe[0])]
 
     def _is_ppe_on_person(self, person_bbox, ppe_bbox):
         cx, cy, _, _ = ppe_bbox
@@ -124,15 +185,15 @@ class EventManager:
 
         return (inter_area / union_area) >= iou_threshold
 
-    def _check_zone(self, bbox, zone):
-        x1, y1, x2, y2 = bbox
-        x_center = (x1 + x2) / 2
-        y_feet = y2
-        point = Point(x_center, y_feet)
-        polygon = Polygon(zone)
-        if polygon.contains(point):
-            return True
-        return False
+    def _handle_zones(self, persons):
+        """ Creates an event for every zone a person has entered since the last frame. """
+        entered, _ = self.zone_engine.update(persons["track_id"], foot_points(persons["bbox"]))
+        if not entered:
+            return
+
+        rows = {track_id: row for row, track_id in enumerate(persons["track_id"].tolist())}
+        for track_id, zone_id in entered:
+            self._create_event(self._as_object(persons[rows[track_id]]), zone_id)
 
     def _create_object(self, obj):
         """ Create an object in the database. """
@@ -144,7 +205,7 @@ class EventManager:
             }
 
             self.logger.info(f"Creating object: ID={obj['track_id']}, Type={obj['class']}")
-            self.db_queue.put(object_msg)
+            self.db_queue.enqueue(object_msg)
 
         except Exception as e:
             self.logger.error(f"Failed to create object: {e}")
@@ -175,7 +236,7 @@ class EventManager:
             self.logger.info(f"Creating event: Object {obj['track_id']} detected {safety_str}")
             self.detection_logger.info(f"Detected {obj['class']} with ID {obj['track_id']} {safety_str}")
 
-            self.db_queue.put(event_msg)
+            self.db_queue.enqueue(event_msg)
 
         except Exception as e:
             self.logger.error(f"Failed to create event: {e}")
@@ -186,7 +247,7 @@ class EventManager:
                 "action": "insert_object_positions",
                 "data": self.object_positions.copy(),
             }
-            self.db_queue.put(obj_pos_msg)
+            self.db_queue.enqueue(obj_pos_msg)
             self.logger.info(f"Storing object positions in DB")
         except Exception as e:
             self.logger.error(f"Failed to insert object positions: {e}")
@@ -211,6 +272,7 @@ class EventManager:
             processed_zones.append(processed_zone)
 
         self.zones = processed_zones
+        self.zone_engine.set_zones(processed_zones, frame_width, frame_height)
 
     def get_zones(self):
         return self.zones
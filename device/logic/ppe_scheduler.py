@@ -0,0 +1,71 @@
+from collections import deque
+
+
+class PPEScheduler:
+    """
+    Schedules PPE re-checks for tracks that are already known and aggregates
+    every check into a per-track vote history.
+
+    At most max_checks_per_frame tracks are re-checked per frame, most stale first,
+    and fewer if the measured cost per check would exceed budget_ms.
+    """
+    def __init__(self, max_checks_per_frame=2, budget_ms=20.0, history=9, min_interval=5):
+        self.max_checks_per_frame = max_checks_per_frame
+        self.budget_ms = budget_ms
+        self.history = history
+        self.min_interval = min_interval
+        self.cost_per_check_ms = None
+        self.votes = {}         # track_id -> deque of sets of PPE names
+        self.last_checked = {}  # track_id -> frame id of the last check
+
+    def select(self, track_ids, frame_id, reserved=0):
+        """
+        Returns the track ids to re-check on this frame.
+        reserved: number of mandatory checks (new tracks) already taking budget.
+        """
+        slots = self.max_checks_per_frame
+        if self.cost_per_check_ms:
+            slots = min(slots, int(self.budget_ms // self.cost_per_check_ms) - reserved)
+        if slots <= 0:
+            return []
+
+        candidates = [
+            track_id for track_id in track_ids
+            if track_id in self.last_checked and frame_id - self.last_checked[track_id] >= self.min_interval
+        ]
+        candidates.sort(key=lambda track_id: self.last_checked[track_id])
+        return candidates[:slots]
+
+    def record_cost(self, num_checks, elapsed_ms, alpha=0.2):
+        if num_checks == 0:
+            return
+        cost = elapsed_ms / num_checks
+        if self.cost_per_check_ms is None:
+            self.cost_per_check_ms = cost
+        else:
+            self.cost_per_check_ms += alpha * (cost - self.cost_per_check_ms)
+
+    def vote(self, track_id, ppe, frame_id):
+        if track_id not in self.votes:
+            self.votes[track_id] = deque(maxlen=self.history)
+        self.votes[track_id].append(set(ppe))
+        self.last_checked[track_id] = frame_id
+
+    def confidence(self, track_id):
+        """ Returns {ppe_name: fraction of checks in the history that saw it}. """
+        history = self.votes.get(track_id)
+        if not history:
+            return {}
+        counts = {}
+        for ppe in history:
+            for name in ppe:
+                counts[name] = counts.get(name, 0) + 1
+        return {name: count / len(history) for name, count in counts.items()}
+
+    def status(self, track_id, threshold=0.5):
+        """ Returns the PPE items seen in at least threshold of the checks. """
+        return [name for name, conf in self.confidence(track_id).items() if conf >= threshold]
+
+    def prune(self, active_tracks):
+        self.votes = {track_id: v for track_id, v in self.votes.items() if track_id in active_tracks}
+        self.last_checked = {track_id: f for track_id, f in self.last_checked.items() if track_id in active_tracks}
@@ -0,0 +1,73 @@
+import numpy as np
+import cv2
+
+
+class ZoneEngine:
+    """
+    Zone membership for all tracks against all zones in one vectorized lookup.
+
+    set_zones rasterizes every zone once into a bit mask at frame resolution, where
+    bit i of a pixel is set if the pixel lies inside zone i. Overlapping zones are
+    supported, so an object can be inside several zones at once.
+    """
+    def __init__(self):
+        self.zone_ids = np.zeros(0, dtype=np.int64)
+        self.mask = None
+        self.inside = set()  # (track_id, zone_id) pairs from the last update
+
+    def set_zones(self, zones, frame_width, frame_height):
+        """ zones: [{zone_id, coords: [[x, y], ...]}] in pixel coordinates. """
+        self.zone_ids = np.array([zone["zone_id"] for zone in zones], dtype=np.int64)
+        self.inside = set()
+        num_words = max(1, (len(zones) + 63) // 64)
+        self.mask = np.zeros((frame_height, frame_width, num_words), dtype=np.uint64)
+
+        layer = np.zeros((frame_height, frame_width), dtype=np.uint8)
+        for i, zone in enumerate(zones):
+            layer[:] = 0
+            cv2.fillPoly(layer, [np.array(zone["coords"], dtype=np.int32)], 1)
+            word, bit = divmod(i, 64)
+            self.mask[..., word][layer.astype(bool)] |= np.uint64(1 << bit)
+
+    def membership(self, points):
+        """
+        points: (N, 2) array of [x, y] pixel positions.
+        Returns an (N, num_zones) bool array.
+        """
+        num_zones = len(self.zone_ids)
+        if self.mask is None or num_zones == 0 or len(points) == 0:
+            return np.zeros((len(points), num_zones), dtype=bool)
+
+        height, width = self.mask.shape[:2]
+        xs = points[:, 0].astype(np.int64)
+        ys = points[:, 1].astype(np.int64)
+        valid = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+
+        words = np.zeros((len(points), self.mask.shape[2]), dtype=np.uint64)
+        words[valid] = self.mask[ys[valid], xs[valid]]
+        zones = np.arange(num_zones)
+        bits = (words[:, zones // 64] >> (zones % 64).astype(np.uint64)) & np.uint64(1)
+        return bits.astype(bool)
+
+    def update(self, track_ids, points):
+        """
+        Updates membership for the given tracks.
+        Returns (entered, exited) as lists of (track_id, zone_id) transitions since the last update.
+        Tracks missing from track_ids are forgotten without an exit transition.
+        """
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        rows, cols = np.nonzero(self.membership(points))
+        current = set(zip(track_ids[rows].tolist(), self.zone_ids[cols].tolist()))
+
+        present = set(track_ids.tolist())
+        previous = {pair for pair in self.inside if pair[0] in present}
+        entered = sorted(current - previous)
+        exited = sorted(previous - current)
+        self.inside = current
+        return entered, exited
+
+
+def foot_points(bboxes):
+    """ Bottom-center point of each [x1, y1, x2, y2] box. """
+    bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+    return np.stack([(bboxes[:, 0] + bboxes[:, 2]) / 2, bboxes[:, 3]], axis=1)
@@ -1,34 +1,80 @@
-import cv2
-from ultralytics import YOLO
 import time
 
 import threading, queue
-import yaml
-from ultralytics.nn.tasks import DetectionModel
-import torch
+import argparse
 from .utils.logger import get_logger
 from .utils.db_worker import db_worker
-from device.training.dataset.dataset_transform import load_class_mapping
-
-from device.DeviceRuntime import DeviceRuntime
+from .utils.journal import JournaledQueue
+from .utils.db_process import DBProcess
+from backend.db.retention import RetentionManager
 
 if __name__ == "__main__":
+    # Heavy imports stay under the guard: with --db_process the spawned worker imports this
+    # module again, and must not load torch and ultralytics just to write SQLite
+    import cv2
+    from ultralytics import YOLO
+    import yaml
+    from ultralytics.nn.tasks import DetectionModel
+    import torch
+    from device.training.dataset.dataset_transform import load_class_mapping
+    from device.DeviceRuntime import DeviceRuntime
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pipelined", action="store_true", help="Run capture, inference and tracking as separate threaded stages")
+    parser.add_argument("--headless", action="store_true", help="Skip all drawing and the OpenCV window")
+    parser.add_argument("--preview", action="store_true", help="Publish annotated frames for the API's /preview stream")
+    parser.add_argument("--preview_fps", type=float, default=5, help="Maximum frame rate of the preview stream")
+    parser.add_argument("--ppe_rechecks", type=int, default=2, help="Maximum PPE re-checks of known tracks per frame")
+    parser.add_argument("--ppe_budget_ms", type=float, default=20.0, help="Time budget for PPE checks per frame")
+    parser.add_argument("--motion_gating", action="store_true", help="Skip the detector on frames without motion")
+    parser.add_argument("--motion_force_every", type=int, default=15, help="Force a full inference at least every N frames")
+    parser.add_argument("--backend", type=str, default="ultralytics", choices=["ultralytics", "onnxruntime", "openvino"],
+                        help="Inference backend for the person and PPE detectors")
+    parser.add_argument("--person_model", type=str, help="Person detector weights, defaults to the backend's standard path")
+    parser.add_argument("--ppe_model", type=str, help="PPE detector weights, defaults to the backend's standard path")
+    parser.add_argument("--fast_startup", action="store_true",
+                        help="Load models in parallel with the camera, warm up during startup and cache optimized models")
+    parser.add_argument("--group_commit", action="store_true", help="Commit database writes in batches instead of one by one")
+    parser.add_argument("--commit_max_batch", type=int, default=200, help="Maximum number of writes per group commit")
+    parser.add_argument("--commit_max_latency_ms", type=float, default=50, help="Maximum time a write waits for its group commit")
+    parser.add_argument("--db_process", action="store_true", help="Run the database worker in a separate process instead of a thread")
+    parser.add_argument("--partition_positions", action="store_true", help="Store object positions in one table per day")
+    parser.add_argument("--retention_days", type=int, default=0,
+                        help="Archive events and positions older than this many days (0 keeps everything in the database)")
+    args = parser.parse_args()
+
     # Initialize logger for main module
     logger = get_logger("Main")
 
     # -- Setup DB Thread --
-    db_queue = queue.Queue(maxsize=100)
+    # Producers never block on a full queue; overflow goes to an on-disk journal
+    db_queue = JournaledQueue(maxsize=100)
     response_queue = queue.Queue()
     stop_event = threading.Event()
 
-    db_thread = threading.Thread(target=db_worker, args=(db_queue, stop_event))
-    db_thread.start()
-
-    device_runtime = DeviceRuntime(db_queue)
+    worker_kwargs = {"group_commit": args.group_commit, "max_batch": args.commit_max_batch,
+                     "max_latency": args.commit_max_latency_ms / 1000, "partition_positions": args.partition_positions}
+    if args.db_process:
+        db_process = DBProcess(db_queue, **worker_kwargs)
+        db_process.start()
+    else:
+        db_thread = threading.Thread(target=db_worker, args=(db_queue, stop_event), kwargs=worker_kwargs)
+        db_thread.start()
+
+    if args.retention_days > 0:
+        retention = RetentionManager("backend/db/events.db", max_age_days=args.retention_days)
+        threading.Thread(target=retention.run, args=(stop_event,), daemon=True).start()
+
+    device_runtime = DeviceRuntime(db_queue, pipelined=args.pipelined, headless=args.headless,
+                                   preview=args.preview, preview_fps=args.preview_fps,
+                                   ppe_rechecks_per_frame=args.ppe_rechecks, ppe_budget_ms=args.ppe_budget_ms,
+                                   motion_gating=args.motion_gating, motion_force_every=args.motion_force_every,
+                                   backend=args.backend, person_model=args.person_model, ppe_model=args.ppe_model,
+                                   fast_startup=args.fast_startup)
     while True:
         try:
             # Check system status
-            db_queue.put({"action": "get_status", "response": response_queue})
+            db_queue.enqueue({"action": "get_status", "response": response_queue})
             try:
                 run_flag = response_queue.get(timeout=0.2)
             except queue.Empty:
@@ -52,7 +98,11 @@ if __name__ == "__main__":
 
     device_runtime.stop()
     stop_event.set()
-    db_thread.join()
+    if args.db_process:
+        db_process.stop()
+    else:
+        db_thread.join()
+    db_queue.close()
 
 
 
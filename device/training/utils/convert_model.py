@@ -6,7 +6,10 @@ import subprocess
 
 def export_onnx(model, dummy_input, output_path):
     model.eval()
-    torch.onnx.export(model, dummy_input, output_path, do_constant_folding=True)
+    # Dynamic batch axis so the runtime backends can batch PPE crops
+    torch.onnx.export(model, dummy_input, output_path, do_constant_folding=True,
+                      input_names=["images"], output_names=["output0"],
+                      dynamic_axes={"images": {0: "batch"}, "output0": {0: "batch"}})
     print(f"Exported model to ONNX: {output_path}")
 
 
@@ -45,7 +48,10 @@ if __name__ == '__main__':
     model = DetectionModel(cfg=model_config, nc=num_classes)
     model.load_state_dict(torch.load(model_path, map_location=lambda storage, loc: storage))
 
-    dummy_input = torch.randn(1, 3, 640, 640).half()
+    dummy_input = torch.randn(1, 3, 640, 640)
+    if args.fp16:
+        model = model.half()
+        dummy_input = dummy_input.half()
 
     export_onnx(model, dummy_input, args.onnx_path)
 
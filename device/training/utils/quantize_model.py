@@ -0,0 +1,123 @@
+import argparse
+import time
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, CalibrationMethod, quantize_static
+from device.training.data.dataset import SafetyDataset
+from device.inference.backends import OnnxRuntimeBackend, box_iou
+
+
+class SafetyCalibrationReader(CalibrationDataReader):
+    """
+    Feeds letterboxed SafetyDataset images to the ONNX Runtime calibrator.
+    """
+    def __init__(self, dataset, input_name, num_samples, seed=0):
+        rng = np.random.default_rng(seed)
+        num_samples = min(num_samples, len(dataset))
+        self.indices = rng.choice(len(dataset), size=num_samples, replace=False).tolist()
+        self.dataset = dataset
+        self.input_name = input_name
+        self.position = 0
+
+    def get_next(self):
+        if self.position >= len(self.indices):
+            return None
+        sample = self.dataset[self.indices[self.position]]
+        self.position += 1
+        return {self.input_name: sample["img"].numpy()[None]}
+
+    def rewind(self):
+        self.position = 0
+
+
+def quantize(onnx_path, int8_path, dataset, num_calibration):
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    reader = SafetyCalibrationReader(dataset, input_name, num_calibration)
+
+    quantize_static(
+        onnx_path,
+        int8_path,
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+    print(f"Saved INT8 model: {int8_path}")
+
+
+def evaluate(model_path, dataset, indices):
+    """
+    Returns latency and accuracy of a model on the given dataset samples.
+    box_loss is the mean (1 - IoU) between each ground-truth box and the best
+    prediction of the same class, recall is the share of ground truths matched with IoU >= 0.5.
+    """
+    backend = OnnxRuntimeBackend(model_path, conf=0.25)
+    latencies = []
+    box_losses = []
+    matched = 0
+    total = 0
+    for index in indices:
+        sample = dataset[index]
+        blob = sample["img"].numpy()[None].astype(backend.input_dtype)
+        size = blob.shape[2]
+
+        start = time.perf_counter()
+        output = backend._forward(blob)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        dets = backend._postprocess(output[0], (1, 0, 0), (size, size))
+        gt_boxes = sample["bboxes"].numpy() * size
+        gt_cls = sample["cls"].numpy()
+        if len(gt_boxes) == 0:
+            continue
+        gt_xyxy = np.concatenate([gt_boxes[:, :2] - gt_boxes[:, 2:] / 2, gt_boxes[:, :2] + gt_boxes[:, 2:] / 2], axis=1)
+        pred_xyxy = np.concatenate([dets[:, :2] - dets[:, 2:4] / 2, dets[:, :2] + dets[:, 2:4] / 2], axis=1)
+
+        iou = box_iou(gt_xyxy, pred_xyxy) if len(dets) else np.zeros((len(gt_boxes), 0))
+        same_class = gt_cls[:, None] == dets[None, :, 5] if len(dets) else np.zeros((len(gt_boxes), 0), dtype=bool)
+        best_iou = np.where(same_class, iou, 0).max(axis=1, initial=0)
+        box_losses.extend((1 - best_iou).tolist())
+        matched += int((best_iou >= 0.5).sum())
+        total += len(gt_boxes)
+
+    return {
+        "latency_ms": float(np.mean(latencies)),
+        "box_loss": float(np.mean(box_losses)) if box_losses else 0.0,
+        "recall": matched / total if total else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--onnx_path", type=str, required=True)
+    parser.add_argument("--int8_path", type=str)
+    parser.add_argument("--images_dir", type=str, required=True)
+    parser.add_argument("--labels_dir", type=str, required=True)
+    parser.add_argument("--num_calibration", type=int, default=200)
+    parser.add_argument("--num_eval", type=int, default=100)
+    args = parser.parse_args()
+
+    int8_path = args.int8_path or args.onnx_path.replace(".onnx", "_int8.onnx")
+    dataset = SafetyDataset(images_dir=args.images_dir, labels_dir=args.labels_dir)
+
+    quantize(args.onnx_path, int8_path, dataset, args.num_calibration)
+
+    eval_indices = np.random.default_rng(1).choice(len(dataset), size=min(args.num_eval, len(dataset)), replace=False)
+    fp32 = evaluate(args.onnx_path, dataset, eval_indices)
+    int8 = evaluate(int8_path, dataset, eval_indices)
+
+    print(f"{'':>10} {'latency (ms)':>13} {'box loss':>9} {'recall':>7}")
+    print(f"{'FP32':>10} {fp32['latency_ms']:>13.1f} {fp32['box_loss']:>9.4f} {fp32['recall']:>7.3f}")
+    print(f"{'INT8':>10} {int8['latency_ms']:>13.1f} {int8['box_loss']:>9.4f} {int8['recall']:>7.3f}")
+    print(f"{'delta':>10} {int8['latency_ms'] - fp32['latency_ms']:>+13.1f} "
+          f"{int8['box_loss'] - fp32['box_loss']:>+9.4f} {int8['recall'] - fp32['recall']:>+7.3f}")
+
+
+
+# usage (from the repository root):
+# python -m device.training.utils.quantize_model --onnx_path device/training/models/yolo11_person_only.onnx --images_dir <valid/images> --labels_dir <valid/labels>
+# python -m device.training.utils.quantize_model --onnx_path device/training/models/yolo11_ppe_only_v2.onnx --images_dir <valid/images> --labels_dir <valid/labels_filtered>
+# then run the device with: --backend onnxruntime --person_model ..._int8.onnx --ppe_model ..._int8.onnx
@@ -0,0 +1,39 @@
+from device.utils.db_worker import db_worker
+
+# Entry point of the DB worker process started by DBProcess (db_process.py).
+# Keep the imports of this module light. The child also re-imports the parent's main module,
+# so device/main.py keeps torch, ultralytics and the runtime under its __main__ guard.
+
+
+class _RemoteResponse:
+    def __init__(self, responses, request_id):
+        self.responses = responses
+        self.request_id = request_id
+
+    def put(self, result):
+        self.responses.put((self.request_id, result))
+
+
+class _RequestQueue:
+    """ Worker side of the request queue; turns request ids back into response objects for db_worker. """
+    def __init__(self, requests, responses):
+        self.requests = requests
+        self.responses = responses
+
+    def get(self, timeout=None):
+        return self._attach_response(self.requests.get(timeout=timeout))
+
+    def get_nowait(self):
+        return self._attach_response(self.requests.get_nowait())
+
+    def empty(self):
+        return self.requests.empty()
+
+    def _attach_response(self, msg):
+        if "request_id" in msg:
+            msg["response"] = _RemoteResponse(self.responses, msg.pop("request_id"))
+        return msg
+
+
+def run_worker(requests, responses, stop_event, db_path, worker_kwargs):
+    db_worker(_RequestQueue(requests, responses), stop_event, db_path, **worker_kwargs)
@@ -0,0 +1,101 @@
+import queue
+import threading
+import multiprocessing as mp
+from device.utils.db_child import run_worker
+from device.utils.logger import get_logger
+
+logger = get_logger("DB")
+
+
+class DBProcess:
+    """
+    Runs db_worker in a separate process so SQLite calls and message handling
+    do not compete with the vision loop for the GIL.
+
+    Producers keep using the local db_queue with the usual message protocol.
+    A forwarder thread moves messages to the worker process and replays the
+    db_queue journal, a receiver thread routes read responses back to the
+    response queue of the original message.
+    """
+    def __init__(self, db_queue, db_path="backend/db/events.db", max_pending=100, **worker_kwargs):
+        self.db_queue = db_queue
+        # spawn: the parent has already loaded torch and started threads, which fork does not handle well
+        ctx = mp.get_context("spawn")
+        self.requests = ctx.Queue(maxsize=max_pending)
+        self.responses = ctx.Queue()
+        self.worker_stop = ctx.Event()
+        self.process = ctx.Process(target=run_worker, name="db_worker", daemon=True,
+                                   args=(self.requests, self.responses, self.worker_stop, db_path, worker_kwargs))
+
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.pending = {}  # request id -> response queue of the caller
+        self.next_request_id = 0
+        self.forwarder = threading.Thread(target=self._forward, name="db_forwarder", daemon=True)
+        self.receiver = threading.Thread(target=self._receive, name="db_receiver", daemon=True)
+
+    def start(self):
+        self.process.start()
+        self.forwarder.start()
+        self.receiver.start()
+        logger.info(f"DB worker process started (pid {self.process.pid})")
+
+    def stop(self, timeout=10):
+        # Forward everything still queued or journaled, then let the worker drain and exit
+        self.stop_event.set()
+        self.forwarder.join()
+        self.worker_stop.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.error("DB worker process did not exit, terminating it")
+            self.process.terminate()
+        self.receiver.join()
+
+    def _forward(self):
+        replay = getattr(self.db_queue, "replay", None)
+        while not self.stop_event.is_set() or not self.db_queue.empty() or getattr(self.db_queue, "spilling", False):
+            if not self.process.is_alive():
+                self._worker_died()
+                return
+            messages = []
+            if replay is not None and self.db_queue.empty():
+                messages = replay()
+            if not messages:
+                try:
+                    messages = [self.db_queue.get(timeout=0.1)]
+                except queue.Empty:
+                    continue
+
+            for msg in messages:
+                if "response" in msg:
+                    msg = dict(msg)
+                    with self.lock:
+                        request_id = self.next_request_id
+                        self.next_request_id += 1
+                        self.pending[request_id] = msg.pop("response")
+                    msg["request_id"] = request_id
+                # Blocks while the worker is behind, so db_queue fills up and spills to its journal
+                while True:
+                    try:
+                        self.requests.put(msg, timeout=0.5)
+                        break
+                    except queue.Full:
+                        if not self.process.is_alive():
+                            self._worker_died()
+                            return
+
+    def _worker_died(self):
+        # Journaled writes stay in the journal until a worker confirms them, see JournaledQueue
+        logger.error(f"DB worker process died (exit code {self.process.exitcode}), no longer forwarding messages")
+
+    def _receive(self):
+        while self.process.is_alive() or not self.responses.empty():
+            try:
+                request_id, result = self.responses.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self.lock:
+                response = self.pending.pop(request_id, None)
+            if response is not None:
+                response.put(result)
+
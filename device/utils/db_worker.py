@@ -1,20 +1,87 @@
-import sqlite3
 import queue
+import time
 from backend.db.database_manager import DatabaseManager
+from device.utils.logger import get_logger
 
-def db_worker(db_queue, stop_event, db_path="backend/db/events.db"):
-    db_manager = DatabaseManager(db_path)
+logger = get_logger("DB")
+
+# Messages that modify the database; everything else is answered right away
+WRITE_ACTIONS = {"insert_object", "insert_event", "insert_object_positions", "set_status"}
+
+
+def db_worker(db_queue, stop_event, db_path="backend/db/events.db", group_commit=False, max_batch=200, max_latency=0.05,
+              partition_positions=False):
+    """
+    Applies messages from db_queue to the database.
+
+    With group_commit, all pending messages are drained at once and writes are
+    committed together in one transaction, flushed when max_batch writes are
+    pending or the oldest pending write is max_latency seconds old. Read messages
+    are answered as soon as they are dequeued; they use the same connection and
+    therefore already see uncommitted writes.
+
+    If db_queue is a JournaledQueue, spilled writes are replayed from its journal
+    whenever the queue itself is empty. Replayed writes are only committed by the
+    journal_commit message ending their batch, which is then confirmed to the journal.
+
+    partition_positions stores object positions in one table per day.
+    """
+    db_manager = DatabaseManager(db_path, partition_positions=partition_positions)
+    pending_writes = 0
+    first_pending = None
+    # JournaledQueue spills writes to disk when full; replay them once the queue has drained
+    replay = getattr(db_queue, "replay", None)
 
 
     print("DB thread started.")
-    while not stop_event.is_set() or not db_queue.empty():
-        try:
-            msg = db_queue.get(timeout=0.1)
-        except queue.Empty:
-            continue
+    while not stop_event.is_set() or not db_queue.empty() or getattr(db_queue, "spilling", False):
+        messages = []
+        if replay is not None and db_queue.empty():
+            messages = replay(max_batch)
+
+        if not messages:
+            timeout = 0.1
+            if pending_writes:
+                timeout = max(0.0, first_pending + max_latency - time.monotonic())
+            try:
+                messages = [db_queue.get(timeout=timeout)]
+            except queue.Empty:
+                pass
+
+        if group_commit:
+            while messages and len(messages) < max_batch:
+                try:
+                    messages.append(db_queue.get_nowait())
+                except queue.Empty:
+                    break
 
+        for msg in messages:
+            if msg.get("action") == "journal_commit":
+                db_manager.commit()
+                pending_writes = 0
+                msg["response"].put(msg["offset"])
+                continue
+            # A replayed batch is committed as a whole, so a crash cannot apply part of it twice
+            journaled = msg.get("journaled", False)
+            handle_message(db_manager, msg, commit=not (group_commit or journaled))
+            if group_commit and not journaled and msg.get("action") in WRITE_ACTIONS:
+                if pending_writes == 0:
+                    first_pending = time.monotonic()
+                pending_writes += 1
+
+        if pending_writes and (pending_writes >= max_batch or time.monotonic() - first_pending >= max_latency):
+            db_manager.commit()
+            pending_writes = 0
+
+    if pending_writes:
+        db_manager.commit()
+    print("DB thread exited.")
+
+
+def handle_message(db_manager, msg, commit=True):
+    try:
         if msg["action"] == "insert_object":
-            db_manager.insert_object(msg["object_id"], msg["type"])
+            db_manager.insert_object(msg["object_id"], msg["type"], commit=commit)
 
         elif msg["action"] == "insert_event":
             db_manager.insert_events(
@@ -23,7 +90,8 @@ def db_worker(db_queue, stop_event, db_path="backend/db/events.db"):
                 msg["location"],
                 int(msg["helmet"]),
                 int(msg["vest"]),
-                msg["time"]
+                msg["time"],
+                commit=commit
             )
 
         elif msg["action"] == "get_status":
@@ -32,7 +100,7 @@ def db_worker(db_queue, stop_event, db_path="backend/db/events.db"):
                 msg["response"].put(status)
 
         elif msg["action"] == "set_status":
-            db_manager.set_ai_running(msg["status"])
+            db_manager.set_ai_running(msg["status"], commit=commit)
         elif msg["action"] == "get_zones":
             location = db_manager.get_active_location()
             location_id = location[0] if location else None
@@ -43,10 +111,10 @@ def db_worker(db_queue, stop_event, db_path="backend/db/events.db"):
         elif msg["action"] == "insert_object_positions":
             data = msg["data"]
             data_db = [
-                (d["object_id"], d["location"], d["x"], d["y"], d["time"])
+                (d["location"], d["object_id"], d["t_ms"], d["x"], d["y"])
                 for d in data
             ]
-            db_manager.insert_object_positions(data_db)
+            db_manager.insert_object_positions(data_db, commit=commit)
         elif msg["action"] == "get_location_id":
             location = db_manager.get_active_location()
             location_id = location[0] if location else None
@@ -58,6 +126,6 @@ def db_worker(db_queue, stop_event, db_path="backend/db/events.db"):
             if "response" in msg:
                 msg["response"].put(last_object_id)
 
-
-
-    print("DB thread exited.")
+    except Exception as e:
+        # A malformed (e.g. old-format journaled) message must not stop the worker and lose the pending batch
+        logger.error(f"Failed to handle {msg.get('action')}: {e!r}")
@@ -0,0 +1,166 @@
+import os
+import json
+import queue
+import threading
+from pathlib import Path
+from device.utils.logger import get_logger
+
+JOURNAL_PATH = Path(__file__).resolve().parent.parent / "logs" / "db_journal.jsonl"
+
+logger = get_logger("DB")
+
+
+class JournaledQueue(queue.Queue):
+    """
+    Bounded db_queue with a non-blocking producer side.
+
+    enqueue() never waits on the DB worker: when the queue is full, write messages
+    are appended to an on-disk journal instead, and every following write goes to
+    the journal as well until the worker has replayed it, so writes keep their order.
+    The journal survives a restart and is replayed on the next run.
+
+    Replay is confirmed: every replayed batch ends with a journal_commit message that
+    the worker answers after committing the batch. Only then is the position saved
+    next to the journal (<journal>.offset), and the journal is truncated once all of
+    it is committed. A crash during replay therefore neither loses writes nor
+    replays committed batches, except for the short moment between the commit and
+    saving the position.
+
+    Read messages carry a response queue and cannot be journaled; when the queue
+    is full they are dropped and the caller runs into its response timeout.
+    """
+    def __init__(self, maxsize=100, journal_path=JOURNAL_PATH):
+        super().__init__(maxsize)
+        self.journal_path = Path(journal_path)
+        self.offset_path = self.journal_path.with_name(self.journal_path.name + ".offset")
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_lock = threading.Lock()
+        self.journal_path.touch()
+        self._drop_torn_line()
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+        self.committed_offset = self._load_offset()
+        self.replay_offset = self.committed_offset  # handed out to the worker, not necessarily committed
+        self.spilled = 0
+        self.spilling = self.journal_path.stat().st_size > self.committed_offset
+        if self.spilling:
+            logger.info(f"Found unreplayed DB journal at {self.journal_path}, resuming at byte {self.committed_offset}")
+        elif self.committed_offset:
+            # Fully committed before a crash, only the truncation is missing
+            self._reset()
+
+    def enqueue(self, msg):
+        """ Queues msg without blocking. Returns False if a read message had to be dropped. """
+        if "response" in msg:
+            try:
+                self.put_nowait(msg)
+                return True
+            except queue.Full:
+                return False
+
+        with self.journal_lock:
+            if not self.spilling:
+                try:
+                    self.put_nowait(msg)
+                    return True
+                except queue.Full:
+                    self.spilling = True
+                    logger.warning("DB queue full, spilling writes to the journal")
+            self.journal.write(json.dumps(msg) + "\n")
+            self.journal.flush()
+            self.spilled += 1
+        return True
+
+    def replay(self, max_messages=200):
+        """
+        Returns the next journaled messages in order, for the DB worker only, followed by a
+        journal_commit message. The worker must apply them in one transaction, before taking
+        new writes from the queue, and answer journal_commit after committing (see db_worker).
+        """
+        with self.journal_lock:
+            if not self.spilling:
+                return []
+
+            messages = []
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                f.seek(self.replay_offset)
+                while len(messages) < max_messages:
+                    line = f.readline()
+                    if not line:
+                        break
+                    try:
+                        msg = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last line from a crash while writing
+                        logger.error(f"Skipping corrupt journal line: {line[:80]!r}")
+                        continue
+                    msg["journaled"] = True
+                    messages.append(msg)
+                end_offset = f.tell()
+
+            if end_offset == self.replay_offset:
+                # Everything is handed out, waiting for the worker to confirm
+                return []
+            self.replay_offset = end_offset
+        messages.append({"action": "journal_commit", "offset": end_offset, "response": _JournalAck(self)})
+        return messages
+
+    def confirm(self, offset):
+        """ Called once the worker has committed everything replayed up to offset. """
+        with self.journal_lock:
+            if offset <= self.committed_offset:
+                return
+            self.committed_offset = offset
+            if offset >= self.journal_path.stat().st_size:
+                self._reset()
+                logger.info(f"DB journal replayed, {self.spilled} writes spilled in total")
+            else:
+                self._save_offset(offset)
+
+    def _drop_torn_line(self):
+        """ Cuts a last line without newline (crash while writing), so the next write does not extend it. """
+        with open(self.journal_path, "rb+") as f:
+            size = end = f.seek(0, os.SEEK_END)
+            keep = 0
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    keep = start + newline + 1
+                    break
+                end = start
+            if keep < size:
+                logger.error(f"Dropping torn last line of the DB journal ({size - keep} bytes)")
+                f.truncate(keep)
+
+    def _reset(self):
+        # Truncate first: a crash in between leaves an offset beyond the end, which _load_offset discards
+        self.journal.truncate(0)
+        self.offset_path.unlink(missing_ok=True)
+        self.committed_offset = self.replay_offset = 0
+        self.spilling = False
+
+    def _load_offset(self):
+        try:
+            offset = int(self.offset_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return 0
+        return offset if offset <= self.journal_path.stat().st_size else 0
+
+    def _save_offset(self, offset):
+        tmp_path = self.offset_path.with_name(self.offset_path.name + ".tmp")
+        tmp_path.write_text(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
+    def close(self):
+        with self.journal_lock:
+            self.journal.close()
+
+
+class _JournalAck:
+    """ Response object of journal_commit messages; the worker's answer confirms the replayed batch. """
+    def __init__(self, journal):
+        self.journal = journal
+
+    def put(self, offset):
+        self.journal.confirm(offset)
@@ -1,23 +1,55 @@
+import os
 import logging
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
+LOG_DIR = Path(__file__).resolve().parent.parent / "logs"
+# device.log is rotated to device.log.1 ... device.log.<LOG_BACKUPS> (.1 is the newest)
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# One file handler per log file, shared by all loggers of the process, so only one handler rotates it
+_file_handlers = {}
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler for a file that several processes (device runtime, DB process, API) append to.
+    Before checking the size it reopens the file if another process has rotated it meanwhile,
+    so it neither keeps writing to the renamed file nor rotates that one a second time.
+    """
+    def shouldRollover(self, record):
+        if self.stream is not None:
+            try:
+                rotated = not os.path.samestat(os.fstat(self.stream.fileno()), os.stat(self.baseFilename))
+            except FileNotFoundError:
+                rotated = True
+            if rotated:
+                self.stream.close()
+                self.stream = self._open()
+        return super().shouldRollover(record)
+
+
 def get_logger(name, log_file="device.log", level=logging.INFO):
-    log_path = Path(__file__).resolve().parent.parent / "logs"
-    log_path.mkdir(parents=True, exist_ok=True)
-    log_file = log_path / log_file
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    log_file = LOG_DIR / log_file
 
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
     if not logger.handlers:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(level)
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+        file_handler = _file_handlers.get(log_file)
+        if file_handler is None:
+            file_handler = SharedRotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+            # Each logger filters by its own level
+            file_handler.setLevel(logging.NOTSET)
+            file_handler.setFormatter(formatter)
+            _file_handlers[log_file] = file_handler
 
         console_handler = logging.StreamHandler()
         console_handler.setLevel(level)
-
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-        file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
 
         logger.addHandler(file_handler)
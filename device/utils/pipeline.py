@@ -0,0 +1,94 @@
+import threading
+import queue
+import time
+from collections import deque
+
+
+class DropOldestQueue:
+    """
+    Bounded queue between pipeline stages.
+    When full, the oldest item is discarded so the consumer always works on the
+    most recent data instead of falling further and further behind.
+    """
+    def __init__(self, maxsize=2):
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.items:
+                self.cond.wait(timeout)
+            if not self.items:
+                raise queue.Empty
+            return self.items.popleft()
+
+    def clear(self):
+        with self.cond:
+            self.items.clear()
+
+
+class LatestFrameGrabber:
+    """
+    Reads the camera in a dedicated thread and keeps only the newest frame.
+    Draining the driver buffer continuously means consumers never see stale frames.
+    """
+    def __init__(self, cam, timer=None, logger=None):
+        self.cam = cam
+        self.timer = timer
+        self.logger = logger
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = None
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        while self.running:
+            start = time.perf_counter()
+            ret, frame = self.cam.read()
+            if not ret:
+                if self.logger:
+                    self.logger.warning("Failed to capture frame from camera")
+                time.sleep(1)
+                continue
+            if self.timer:
+                self.timer.record("capture", (time.perf_counter() - start) * 1000)
+            with self.cond:
+                self.frame = frame
+                self.frame_id += 1
+                self.frame_time = time.perf_counter()
+                self.cond.notify_all()
+
+    def read(self, last_id, timeout=1.0):
+        """
+        Returns (frame_id, frame, capture_time) for the newest frame newer than last_id.
+        Raises queue.Empty if no new frame arrives within timeout.
+        """
+        with self.cond:
+            if self.frame_id == last_id:
+                self.cond.wait(timeout)
+            if self.frame_id == last_id or self.frame is None:
+                raise queue.Empty
+            return self.frame_id, self.frame, self.frame_time
@@ -0,0 +1,86 @@
+import os
+import time
+from pathlib import Path
+import cv2
+
+# The device runtime and the API run as separate processes, so the preview is
+# handed over through the snapshot directory: the API touches a heartbeat file
+# while a client is connected, and the runtime only renders frames while that
+# heartbeat is fresh.
+PREVIEW_DIR = Path(__file__).resolve().parent.parent / "snapshot"
+PREVIEW_FRAME = PREVIEW_DIR / "preview.jpg"
+PREVIEW_HEARTBEAT = PREVIEW_DIR / "preview_active"
+HEARTBEAT_TIMEOUT = 3.0
+
+
+class PreviewPublisher:
+    """
+    Device side of the preview stream.
+    Publishes annotated frames as JPEG at most max_fps times per second, and only
+    while a preview client is connected.
+    """
+    def __init__(self, max_fps=5, jpeg_quality=70, heartbeat_check_interval=1.0):
+        self.min_interval = 1.0 / max_fps
+        self.jpeg_quality = jpeg_quality
+        self.heartbeat_check_interval = heartbeat_check_interval
+        self.last_publish = 0.0
+        self.last_heartbeat_check = 0.0
+        self.client_connected = False
+        PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+
+    def wants_frame(self):
+        now = time.time()
+        if now - self.last_heartbeat_check >= self.heartbeat_check_interval:
+            self.last_heartbeat_check = now
+            try:
+                self.client_connected = now - PREVIEW_HEARTBEAT.stat().st_mtime < HEARTBEAT_TIMEOUT
+            except FileNotFoundError:
+                self.client_connected = False
+        return self.client_connected and now - self.last_publish >= self.min_interval
+
+    def publish(self, frame):
+        self.last_publish = time.time()
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        tmp_path = PREVIEW_FRAME.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp_path, PREVIEW_FRAME)
+
+
+def mjpeg_stream(max_fps=5, stale_timeout=5.0):
+    """
+    API side of the preview stream.
+    Yields multipart MJPEG chunks with the latest published frame and keeps the
+    heartbeat fresh for as long as the client stays connected.
+    Yields (an empty chunk if there is no new frame) on every iteration, so the server
+    regains control and notices a disconnected client, and ends the stream once the
+    device has not published a frame for stale_timeout seconds.
+    """
+    PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+    min_interval = 1.0 / max_fps
+    last_mtime = None
+    last_touch = 0.0
+    last_frame = time.time()
+    while True:
+        now = time.time()
+        if now - last_touch >= 1.0:
+            PREVIEW_HEARTBEAT.touch()
+            last_touch = now
+        chunk = b""
+        try:
+            mtime = PREVIEW_FRAME.stat().st_mtime
+            if mtime != last_mtime:
+                last_mtime = mtime
+                with open(PREVIEW_FRAME, "rb") as f:
+                    data = f.read()
+                chunk = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + data + b"\r\n"
+                last_frame = now
+        except FileNotFoundError:
+            pass
+        if not chunk and now - last_frame >= stale_timeout:
+            # Device is down or not publishing
+            return
+        yield chunk
+        time.sleep(min_interval)
@@ -0,0 +1,98 @@
+import time
+import threading
+
+
+class StageTimer:
+    """
+    Rolling per-stage timing statistics.
+    Each stage reports how long it spent on one frame; averages are kept as an
+    exponential moving average so the summary reflects recent behaviour.
+    """
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def record(self, stage, elapsed_ms):
+        with self.lock:
+            entry = self.stats.get(stage)
+            if entry is None:
+                self.stats[stage] = {"avg_ms": elapsed_ms, "max_ms": elapsed_ms, "count": 1}
+                return
+            entry["avg_ms"] += self.alpha * (elapsed_ms - entry["avg_ms"])
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["count"] += 1
+
+    def measure(self, stage):
+        return _StageContext(self, stage)
+
+    def snapshot(self):
+        with self.lock:
+            return {stage: dict(entry) for stage, entry in self.stats.items()}
+
+    def reset_max(self):
+        with self.lock:
+            for entry in self.stats.values():
+                entry["max_ms"] = entry["avg_ms"]
+
+    def summary(self):
+        parts = []
+        for stage, entry in self.snapshot().items():
+            parts.append(f"{stage}: {entry['avg_ms']:.1f}ms (max {entry['max_ms']:.1f}ms)")
+        return ", ".join(parts)
+
+
+class _StageContext:
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.record(self.stage, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class PhaseTimer:
+    """
+    Wall-clock timing of named phases, e.g. during startup.
+    Phases may run concurrently in different threads; the report lists every phase
+    plus the total elapsed time so the overlap is visible.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.phases = []
+
+    def phase(self, name):
+        return _PhaseContext(self, name)
+
+    def _record(self, name, begin, end):
+        with self.lock:
+            self.phases.append((name, begin - self.start, end - self.start))
+
+    def report(self):
+        total = time.perf_counter() - self.start
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+        parts = [f"{name} {end - begin:.2f}s (at {begin:.2f}s)" for name, begin, end in phases]
+        return f"total {total:.2f}s: " + ", ".join(parts)
+
+
+class _PhaseContext:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.begin = None
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer._record(self.name, self.begin, time.perf_counter())
+        return False
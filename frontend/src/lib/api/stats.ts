@@ -57,6 +57,26 @@ export interface PPEComplianceData {
     missingBoth: number;
 }
 
+// One bucket of the /stats series (bucket is a local ISO timestamp of the hour or day start)
+export interface StatsSeriesPoint {
+    bucket: string;
+    persons: number;
+    vehicles: number;
+    ppeBreaches: number;
+    zoneEntries: number;
+}
+
+// Response of the /stats endpoint, computed server-side from rollup tables
+export interface StatsResponse extends DashboardStats {
+    location_id: number;
+    start: string;
+    end: string;
+    bucket: 'hour' | 'day';
+    ppeCompliance: PPEComplianceData;
+    zoneEntries: Record<string, number>;
+    series: StatsSeriesPoint[];
+}
+
 // Helper function to calculate time range based on option
 export function calculateTimeRange(option: TimeRangeOption, customRange?: TimeRange): TimeRange {
     const end = new Date();
@@ -268,6 +288,31 @@ export async function fetchEventsByLocationAndTime(
     }
 }
 
+/**
+ * Fetch dashboard statistics for a location, aggregated server-side
+ * @param locationId - The ID of the location to fetch statistics for
+ * @param timeRange - TimeRange object containing start and end dates
+ * @returns Promise<StatsResponse> - Totals, PPE compliance and a time series
+ */
+export async function fetchStatsForLocation(
+    locationId: number,
+    timeRange: TimeRange
+): Promise<StatsResponse> {
+    const response = await fetch(
+        `${API_BASE_URL}/stats?location_id=${locationId}&start=${encodeURIComponent(timeRange.start.toISOString())}&end=${encodeURIComponent(timeRange.end.toISOString())}`
+    );
+
+    if (!response.ok) {
+        throw new Error(`Failed to fetch stats: ${response.statusText}`);
+    }
+
+    const data = await response.json();
+    if (data.status === 'error') {
+        throw new Error(data.message);
+    }
+    return data as StatsResponse;
+}
+
 /**
  * Fetch events for a specific location using TimeRange object
  * @param locationId - The ID of the location to fetch events for
@@ -372,6 +417,38 @@ export function calculatePPEComplianceFromEvents(events: Event[]): PPECompliance
 export function createBarChartDataFromEvents(
     events: Event[],
     timeRange: TimeRange
+): DetectionBarChartData {
+    return createBarChartData(
+        events.map(event => ({ time: event.time, persons: 1, vehicles: 0 })),
+        timeRange
+    );
+}
+
+/**
+ * Group a /stats series into the bar chart intervals
+ * @param series - Series points of a StatsResponse
+ * @param timeRange - The time range for grouping
+ * @returns DetectionBarChartData object
+ */
+export function createBarChartDataFromSeries(
+    series: StatsSeriesPoint[],
+    timeRange: TimeRange
+): DetectionBarChartData {
+    return createBarChartData(
+        series.map(point => ({ time: point.bucket, persons: point.persons, vehicles: point.vehicles })),
+        timeRange
+    );
+}
+
+interface CountedItem {
+    time: string;
+    persons: number;
+    vehicles: number;
+}
+
+function createBarChartData(
+    items: CountedItem[],
+    timeRange: TimeRange
 ): DetectionBarChartData {
     const labels: string[] = [];
     const persons: number[] = [];
@@ -379,75 +456,50 @@ export function createBarChartDataFromEvents(
 
     const hoursDiff = Math.floor((timeRange.end.getTime() - timeRange.start.getTime()) / (1000 * 60 * 60));
 
-    // Group events by time intervals
-    if (hoursDiff <= 24) {
-        // Day view - hourly data
-        const hourCounts = new Array(24).fill(0);
-
-        events.forEach(event => {
-            const eventDate = new Date(event.time);
-            const hour = eventDate.getHours();
-            hourCounts[hour]++;
+    // Adds every item's counts to the bar returned by bucketOf (null = outside the chart)
+    const accumulate = (numBars: number, bucketOf: (date: Date) => number | null) => {
+        const personCounts = new Array(numBars).fill(0);
+        const vehicleCounts = new Array(numBars).fill(0);
+        items.forEach(item => {
+            const bar = bucketOf(new Date(item.time));
+            if (bar !== null && bar >= 0 && bar < numBars) {
+                personCounts[bar] += item.persons;
+                vehicleCounts[bar] += item.vehicles;
+            }
         });
+        persons.push(...personCounts);
+        vehicles.push(...vehicleCounts);
+    };
 
+    // Group items by time intervals
+    if (hoursDiff <= 24) {
+        // Day view - hourly data
+        accumulate(24, date => date.getHours());
         for (let i = 0; i < 24; i++) {
             labels.push(`${i}:00`);
-            persons.push(hourCounts[i]);
-            vehicles.push(0); // Adjust based on your data
         }
     } else if (hoursDiff <= 168) {
         // Week view - daily data
         const days = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
-        const dayCounts = new Array(7).fill(0);
-
-        events.forEach(event => {
-            const eventDate = new Date(event.time);
-            const dayOfWeek = eventDate.getDay();
-            dayCounts[dayOfWeek]++;
-        });
-
-        for (let i = 0; i < 7; i++) {
-            labels.push(days[i]);
-            persons.push(dayCounts[i]);
-            vehicles.push(0);
-        }
+        accumulate(7, date => date.getDay());
+        labels.push(...days);
     } else if (hoursDiff <= 720) {
         // Month view - daily data
         const numDays = Math.ceil(hoursDiff / 24);
-        const dayCounts = new Array(numDays).fill(0);
-
-        events.forEach(event => {
-            const eventDate = new Date(event.time);
-            const dayDiff = Math.floor((eventDate.getTime() - timeRange.start.getTime()) / (1000 * 60 * 60 * 24));
-            if (dayDiff >= 0 && dayDiff < numDays) {
-                dayCounts[dayDiff]++;
-            }
-        });
+        accumulate(numDays, date => Math.floor((date.getTime() - timeRange.start.getTime()) / (1000 * 60 * 60 * 24)));
 
         for (let i = 0; i < numDays; i++) {
             const date = new Date(timeRange.start);
             date.setDate(date.getDate() + i);
             labels.push(`${date.getMonth() + 1}/${date.getDate()}`);
-            persons.push(dayCounts[i]);
-            vehicles.push(0);
         }
     } else {
         // All time - weekly data
         const numWeeks = Math.ceil(hoursDiff / 168);
-        const weekCounts = new Array(numWeeks).fill(0);
-
-        events.forEach(event => {
-            const eventDate = new Date(event.time);
-            const weekDiff = Math.floor((eventDate.getTime() - timeRange.start.getTime()) / (1000 * 60 * 60 * 24 * 7));
-            if (weekDiff >= 0 && weekDiff < numWeeks) {
-                weekCounts[weekDiff]++;
-            }
-        });
+        accumulate(numWeeks, date => Math.floor((date.getTime() - timeRange.start.getTime()) / (1000 * 60 * 60 * 24 * 7)));
 
         for (let i = 0; i < numWeeks; i++) {
             labels.push(`Week ${i + 1}`);
-            persons.push(weekCounts[i]);
-            vehicles.push(0);
         }
     }
 